@@ -0,0 +1,22 @@
+"""Process-wide counts of calls made to external APIs, for batch and benchmark reports."""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counts = Counter()
+
+
+def record(api):
+    with _lock:
+        _counts[api] += 1
+
+
+def snapshot():
+    with _lock:
+        return dict(_counts)
+
+
+def since(before):
+    """Calls made since an earlier snapshot(), per API."""
+    now = snapshot()
+    return {api: count - before.get(api, 0) for api, count in now.items() if count - before.get(api, 0)}
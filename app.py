@@ -1,378 +1,196 @@
 import streamlit as st
-import time
-import google.generativeai as genai
-from google.api_core.exceptions import TooManyRequests
+import backends
 import json
-import re
-from duckduckgo_search import DDGS
-
-# Configure the Gemini API key (Keep this secure, consider using Streamlit secrets)
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-
-# Backend functions (copy your existing functions here)
-def search_properties(preferences):
-    location = preferences.get('location', 'Mumbai')
-    budget = preferences.get('budget', '')
-    carpet_area = preferences.get('carpet_area', '')
-    floor_preference = preferences.get('floor_preference', '')
-    financing = preferences.get('financing', '')
-
-    search_query_parts = [f"property for sale in {location}"]
-    if budget:
-        search_query_parts.append(f"budget {budget}")
-    if carpet_area:
-        search_query_parts.append(f"carpet area around {carpet_area} sq ft")
-    if floor_preference:
-        search_query_parts.append(f"floor preference {floor_preference}")
-
-    search_query = " ".join(search_query_parts)
-    st.info(f"Searching for: {search_query}")
-    ddgs = DDGS()
-    results = list(ddgs.text(search_query, region='in-mh', max_results=5)) # Limiting for Streamlit demo
-    return results
+import queue
+import tracing
+from property_analysis import analysis_cache
+from pipeline import (
+    build_search_query,
+    run_recommendation,
+)
+
+SESSION_RUNS_KEPT = 5 # Finished runs kept per browser session, keyed by their preferences
+
+# Backends come from PROPERTY_FINDER_BACKEND (live by default). The Gemini API key is read from
+# Streamlit secrets only when the first live Gemini call is made, so the app also runs on the
+# fake and replay backends without one.
+backends.configure(gemini_api_key=lambda: st.secrets["GEMINI_API_KEY"])
+
+# Rendering helpers for the pipeline's results; these run on the script thread.
+def show_locality_information(locality):
+    st.subheader(f"Locality Information for {locality['name']}")
+    if locality.get('error'):
+        st.error(locality['error'])
+    elif locality['summary']:
+        st.info(f"Locality Summary:\n{locality['summary']}")
+    else:
+        st.info("No significant locality information found online to summarize.")
 
-def analyze_property_with_gemini_with_retry(search_result, max_retries=3, initial_delay=5):
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = f"""You are an AI Property Assistant. Analyze the following property listing and extract the information as a JSON object. Do not include any other text or explanations in your response.
+def show_builder_information(builder):
+    if not builder['name']:
+        return
+    st.subheader(f"Builder Information for {builder['name']}")
+    if builder.get('error'):
+        st.error(builder['error'])
+    elif builder['summary']:
+        st.info(f"Builder Summary:\n{builder['summary']}")
+    else:
+        st.info("No significant builder information found online to summarize.")
 
-{{
-  "price": "approximate price if mentioned",
-  "area_sqft": "carpet or built-up area in square feet if mentioned",
-  "bedrooms": "number of bedrooms if mentioned",
-  "bathrooms": "number of bathrooms if mentioned",
-  "amenities": ["list of key amenities mentioned"],
-  "builder": "name of the builder/constructor if mentioned",
-  "builder_reputation_highlights": "any highlights about the builder's reputation or past projects mentioned in the listing",
-  "locality_highlights": "key highlights or features of the locality mentioned"
-}}
+class StreamedPlaceholders:
+    """Named st.empty() slots that pipeline tasks can stream partial text into.
 
-Title: {search_result['title']}
-Description: {search_result['body']}
+    Worker threads only queue text through writer(); flush() draws it and has to run on the
+    script thread, since Streamlit elements cannot be updated from other threads.
+    """
 
-If a piece of information is not available, set its value to null or an empty list/string. Ensure the output is a valid JSON object.
-"""
-    for attempt in range(max_retries):
-        try:
-            response = model.generate_content(prompt)
-            raw_response = response.text.strip()
-            if raw_response.startswith("```json"):
-                raw_response = raw_response[len("```json"):].strip()
-            elif raw_response.startswith("```"):
-                raw_response = raw_response[len("```"):].strip()
-            if raw_response.endswith("```"):
-                raw_response = raw_response[:-len("```")].strip()
+    def __init__(self):
+        self._slots = {}
+        self._updates = queue.Queue()
 
-            if not raw_response.startswith('{'):
-                st.warning(f"Gemini's response issue (Attempt {attempt + 1}): {raw_response[:50]}...")
-                return {"error": "Response format issue"}
+    def add(self, name, label):
+        self._slots[name] = (st.empty(), label)
 
-            try:
-                analysis_dict = json.loads(raw_response)
-                return analysis_dict
-            except json.JSONDecodeError as e:
-                st.warning(f"JSON Decode Error (Attempt {attempt + 1}): {raw_response}")
-                st.error(f"JSONDecodeError: {e}")
-                return {"error": "Could not parse analysis"}
-        except TooManyRequests as e:
-            if attempt < max_retries - 1:
-                delay = initial_delay * (2 ** attempt)
-                st.warning(f"Rate limit exceeded. Retrying in {delay:.2f} seconds...")
-                time.sleep(delay)
-            else:
-                st.error(f"Failed after {max_retries} retries due to rate limit: {e}")
-                return {"error": "Rate limit exceeded"}
-        except Exception as e:
-            st.error(f"An unexpected error occurred: {e}")
-            return {"error": f"Unexpected error: {e}"}
-    return {"error": "Analysis failed after multiple retries"}
+    def __getitem__(self, name):
+        return self._slots[name][0]
 
-def compare_properties(analyzed_properties, user_preferences, search_results):
-    compared_properties = []
-    preferred_location = user_preferences.get('location', '').lower()
-    preferred_budget_str = user_preferences.get('budget', '')
-    preferred_area_str = user_preferences.get('carpet_area', '')
-    preferred_floor = user_preferences.get('floor_preference', '').lower()
-    financing_available = user_preferences.get('financing', '').lower()
-    preferred_amenities_str = user_preferences.get('preferred_amenities', '').lower()
-    preferred_amenities = [amenity.strip() for amenity in preferred_amenities_str.split(',') if amenity.strip()]
+    def writer(self, name):
+        return lambda text: self._updates.put((name, text))
 
-    def get_numeric_budget(budget_str):
-        budget_str = budget_str.lower().replace('approx.', '').replace('rs.', '').replace(',', '').replace('₹', '')
-        parts = budget_str.split('-')
-        if len(parts) == 2:
+    def flush(self):
+        latest = {}
+        while True:
             try:
-                return float(parts[0].strip()) * 10000000 if 'cr' in parts[0].lower() else float(parts[0].strip()) * 100000 if 'lac' in parts[0].lower() else float(parts[0].strip()), \
-                       float(parts[1].strip()) * 10000000 if 'cr' in parts[1].lower() else float(parts[1].strip()) * 100000 if 'lac' in parts[1].lower() else float(parts[1].strip())
-            except ValueError:
-                return None, None
-        try:
-            value = float(budget_str.strip())
-            if 'cr' in budget_str.lower():
-                return value * 10000000, value * 10000000
-            elif 'lac' in budget_str.lower():
-                return value * 100000, value * 100000
-            else:
-                return value, value
-        except ValueError:
-            return None, None
-
-    min_preferred_budget, max_preferred_budget = get_numeric_budget(preferred_budget_str)
-
-    def get_numeric_area(area_str):
-        area_str = area_str.lower().replace('sq ft', '').strip()
-        try:
-            return float(area_str)
-        except ValueError:
-            return None
-
-    preferred_area = get_numeric_area(preferred_area_str)
-
-    for i, prop_analysis in enumerate(analyzed_properties):
-        if "error" not in prop_analysis:
-            comparison_details = {
-                'property_index': i + 1,
-                'url': search_results[i]['href'],
-                'title': search_results[i]['title'],
-                'analysis': prop_analysis,
-                'comparison_points': []
-            }
-
-            # Location Comparison
-            location_match = False
-            result = search_results[i]
-            locality_highlights = prop_analysis.get('locality_highlights')
-            if locality_highlights and isinstance(locality_highlights, str) and preferred_location in locality_highlights.lower():
-                location_match = True
-                comparison_details['comparison_points'].append("Location: Matches preferred location.")
-            elif locality_highlights and isinstance(locality_highlights, list) and any(preferred_location in item.lower() for item in locality_highlights):
-                location_match = True
-                comparison_details['comparison_points'].append("Location: Matches preferred location.")
-            elif preferred_location in result['title'].lower() or preferred_location in result['body'].lower():
-                location_match = True
-                comparison_details['comparison_points'].append("Location: Matches preferred location.")
-            else:
-                comparison_details['comparison_points'].append("Location: Might not match preferred location.")
-
-            # Budget Comparison
-            price = prop_analysis.get('price')
-            budget_friendly = False
-            if price:
-                price_lower = price.lower()
-                prop_min_budget, prop_max_budget = get_numeric_budget(price_lower)
-                if min_preferred_budget is not None and prop_min_budget is not None:
-                    if max_preferred_budget is not None and prop_max_budget is not None:
-                        if min_preferred_budget <= prop_max_budget and max_preferred_budget >= prop_min_budget:
-                            budget_friendly = True
-                            comparison_details['comparison_points'].append("Budget: Potentially within budget.")
-                        else:
-                            comparison_details['comparison_points'].append("Budget: Potentially outside budget.")
-                    elif max_preferred_budget is None and min_preferred_budget <= prop_min_budget:
-                         budget_friendly = True
-                         comparison_details['comparison_points'].append("Budget: Potentially within budget.")
-                    elif prop_max_budget is None and max_preferred_budget >= prop_min_budget:
-                        budget_friendly = True
-                        comparison_details['comparison_points'].append("Budget: Potentially within budget.")
-                    elif prop_min_budget == prop_max_budget and min_preferred_budget <= prop_min_budget <= max_preferred_budget:
-                        budget_friendly = True
-                        comparison_details['comparison_points'].append("Budget: Potentially within budget.")
-                    else:
-                        comparison_details['comparison_points'].append("Budget: Potentially outside budget.")
-                else:
-                    comparison_details['comparison_points'].append("Budget: Price information unclear for comparison.")
-            else:
-                comparison_details['comparison_points'].append("Budget: No price information found.")
-
-            # Area Comparison
-            area_data = prop_analysis.get('area_sqft')
-            area_str = ''
-            if isinstance(area_data, dict):
-                if 'carpet' in area_data and area_data['carpet']:
-                    area_str = str(area_data['carpet'])
-                elif 'built_up' in area_data and area_data['built_up']:
-                    area_str = str(area_data['built_up'])
-            elif isinstance(area_data, (int, float, str)):
-                area_str = str(area_data)
-
-            prop_area = get_numeric_area(area_str.lower()) if area_str else None
-            if preferred_area is not None and prop_area is not None:
-                area_difference_percentage = abs(preferred_area - prop_area) / preferred_area
-                if area_difference_percentage < 0.1: # Allowing a 10% difference
-                    comparison_details['comparison_points'].append(f"Area: Close to preferred area ({preferred_area} sq ft).")
-                elif prop_area > preferred_area:
-                    comparison_details['comparison_points'].append(f"Area: Larger than preferred area ({preferred_area} sq ft).")
-                elif prop_area < preferred_area:
-                    comparison_details['comparison_points'].append(f"Area: Smaller than preferred area ({preferred_area} sq ft).")
-            elif preferred_area is not None and prop_area is None and area_str:
-                comparison_details['comparison_points'].append("Area: Could not determine area for comparison.")
-            elif preferred_area is not None and not area_str:
-                comparison_details['comparison_points'].append("Area: No area information found.")
-
-            # Floor Preference
-            if preferred_floor and preferred_floor in result['title'].lower() or preferred_floor in result['body'].lower():
-                comparison_details['comparison_points'].append(f"Floor Preference: Mentions preferred floor ({preferred_floor}).")
-            elif preferred_floor:
-                comparison_details['comparison_points'].append(f"Floor Preference: Does not mention preferred floor ({preferred_floor}).")
-
-            # Amenities Comparison
-            property_amenities = [amenity.lower().strip() for amenity in prop_analysis.get('amenities', [])]
-            found_preferred = []
-            not_found_preferred = []
-            for pref_amenity in preferred_amenities:
-                normalized_pref_amenity = pref_amenity.lower().strip()
-                if normalized_pref_amenity in property_amenities:
-                    found_preferred.append(pref_amenity)
-                else:
-                    not_found_preferred.append(pref_amenity)
-
-            if found_preferred:
-                comparison_details['comparison_points'].append(f"Amenities: Includes preferred amenities: {', '.join(found_preferred)}.")
-            if not_found_preferred:
-                comparison_details['comparison_points'].append(f"Amenities: Missing some preferred amenities: {', '.join(not_found_preferred)}.")
-            elif preferred_amenities and not found_preferred:
-                comparison_details['comparison_points'].append("Amenities: Does not mention any preferred amenities.")
-            elif not preferred_amenities:
-                comparison_details['comparison_points'].append("Amenities: No preferred amenities specified.")
-
-            # Financing
-            if financing_available and financing_available in result['title'].lower() or financing_available in result['body'].lower():
-                comparison_details['comparison_points'].append(f"Financing: Mentions related financing options ({financing_available}).")
-            elif financing_available:
-                comparison_details['comparison_points'].append(f"Financing: Does not mention related financing options ({financing_available}).")
-
-            # Builder Reputation Highlights
-            builder_reputation = prop_analysis.get('builder_reputation_highlights')
-            if builder_reputation:
-                comparison_details['comparison_points'].append(f"Builder Reputation: Highlights mentioned in listing.")
-
-            compared_properties.append(comparison_details)
-
+                name, text = self._updates.get_nowait()
+            except queue.Empty:
+                break
+            latest[name] = text
+        for name, text in latest.items():
+            placeholder, label = self._slots[name]
+            placeholder.info(f"{label}\n{text}")
+
+def show_trace(trace):
+    """Debug panel: a waterfall of the run's spans, with the spans and metrics to download."""
+    import altair as alt # Only needed for this panel, and slow to import
+    rows = []
+    for i, (depth, span, offset) in enumerate(trace.waterfall()):
+        rows.append({
+            'step': f"{i + 1:03d} {'. ' * depth}{span.name}",
+            'stage': span.name.split('.')[0],
+            'start_ms': round(offset * 1000, 1),
+            'end_ms': round((offset + span.duration) * 1000, 1),
+            'duration_ms': round(span.duration * 1000, 1),
+            'thread': span.thread,
+            'details': json.dumps(span.attributes, default=str) + (f" error: {span.error}" if span.error else ""),
+        })
+    with st.expander("Debug: request trace"):
+        chart = alt.Chart(alt.Data(values=rows)).mark_bar().encode(
+            x=alt.X('start_ms:Q', title="ms since submit"),
+            x2='end_ms:Q',
+            y=alt.Y('step:N', sort=None, title=None),
+            color=alt.Color('stage:N', legend=None),
+            tooltip=['step:N', 'duration_ms:Q', 'thread:N', 'details:N'],
+        ).properties(height=max(120, 18 * len(rows)))
+        st.altair_chart(chart, use_container_width=True)
+        st.download_button("Download spans (JSONL)", trace.to_jsonl(), file_name=f"trace-{trace.trace_id}.jsonl")
+        st.download_button("Download metrics (Prometheus)", tracing.prometheus_text(), file_name="metrics.txt")
+
+def show_analysis(search_results, listings, analyses, out_of_budget=None):
+    st.subheader("Analyzing Properties...")
+    cache_stats = analysis_cache.stats()
+    st.caption(f"Analysis cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    skipped = len(search_results) - len(listings)
+    if skipped and out_of_budget:
+        st.caption(f"{skipped} more listings found were not analyzed, since the {out_of_budget} budget ran out")
+    elif skipped:
+        st.caption(f"{skipped} more listings found were not analyzed, since they could not make the top 3")
+    for i, (result, analysis) in enumerate(zip(listings, analyses)):
+        duplicates = f" (also listed {len(result['duplicates'])} more times)" if result.get('duplicates') else ""
+        if not analysis.get("error"):
+            st.write(f"Analyzed property {i+1}: {result['title']}{duplicates}")
         else:
-            st.error(f"Property {i+1} Analysis failed: {prop_analysis['error']}")
-
-    return compared_properties
-
-def get_locality_information(location):
-    st.subheader(f"Locality Information for {location}")
-    ddgs = DDGS()
-    locality_info = {}
-    all_snippets = []
-
-    queries = [
-        f"{location} schools",
-        f"{location} hospitals",
-        f"{location} malls",
-        f"{location} distance from railway station",
-        f"{location} distance from metro station",
-        f"{location} distance from airport",
-        f"{location} places to visit",
-        f"{location} crime rate safety",
-        f"{location} problems"
-    ]
-
-    for query in queries:
-        results = list(ddgs.text(query, region='in-mh', max_results=1)) # Limiting to 1 for brevity in Streamlit
-        if results:
-            for result in results:
-                all_snippets.append(result['body'])
-                time.sleep(1)
-            locality_info[query] = results
-        else:
-            locality_info[query] = []
-            time.sleep(1)
-
-    locality_summary = ""
-    if all_snippets:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""You are a helpful AI assistant summarizing information about the locality of {location} for a potential home buyer. Based on the following information found on the internet, provide a concise summary covering aspects like nearby schools, hospitals, malls, distance from railway station, metro station, airport, places to visit, crime rate, safety parameters, and any potential problems.
-
-Information:
-{' '.join(all_snippets)}
-
-Locality Summary for Buyer:
-"""
-        try:
-            response = model.generate_content(prompt)
-            locality_summary = response.text.strip()
-            st.info(f"Locality Summary:\n{locality_summary}")
-        except Exception as e:
-            st.error(f"Error summarizing locality information: {e}")
+            st.error(f"Analysis failed for: {result['title']} - {analysis.get('error')}")
+
+def show_recommendation(i, prop):
+    st.markdown(f"### Recommendation {i + 1}")
+    st.write(f"**Property:** {prop['search_result']['title']}")
+    st.write(f"**Link:** {prop['search_result']['href']}")
+    if prop['search_result'].get('duplicates'):
+        st.write("**Also listed at:** " + ", ".join(result['href'] for result in prop['search_result']['duplicates']))
+
+def run_pipeline(user_preferences):
+    """Runs the pipeline, drawing each stage as it finishes, and returns what was drawn so a
+    rerun can show it again with show_run().
+    """
+    run = {'builders': {}, 'summaries': {}}
+    st.info(f"Searching for: {build_search_query(user_preferences)}")
+    # Sections are laid out up front and filled in as their stages finish, in whatever order that is.
+    slots = StreamedPlaceholders()
+    slots.add("locality", "Locality Summary:")
+    analysis_section = st.container()
+    recommendations_section = st.container()
+
+    with st.spinner("Finding properties..."):
+        # Locality information does not depend on the search, so both start immediately. Search,
+        # analysis and ranking interleave: listings are analyzed only while they could still make the top 3.
+        for name, future in run_recommendation(user_preferences, top_k=3, writer=slots.writer, on_wait=slots.flush):
+            if name == "locality":
+                run['locality'] = future.result()
+                with slots["locality"].container():
+                    show_locality_information(run['locality'])
+
+            elif name == "search":
+                run.update(future.result())
+                if not run['search_results']:
+                    analysis_section.warning("No search results found based on your preferences.")
+                elif run['listings']:
+                    with analysis_section:
+                        show_analysis(run['search_results'], run['listings'], run['analyses'], run['out_of_budget'])
+
+                with recommendations_section:
+                    if run['ranked_properties']:
+                        st.subheader("Top 3 Property Recommendations")
+                    else:
+                        st.info("No suitable properties found based on your preferences.")
+                    for i, prop in enumerate(run['ranked_properties'][:3]):
+                        show_recommendation(i, prop)
+                        # Filled in by the builder lookup and summary run_recommendation starts next.
+                        slots.add(f"builder:{i}", "Builder Summary:")
+                        slots.add(f"summary:{i}", "**Property Summary:**")
+                        st.write("---")
+
+            elif name.startswith("builder:"):
+                run['builders'][name] = future.result()
+                with slots[name].container():
+                    show_builder_information(run['builders'][name])
+
+            elif name.startswith("summary:"):
+                run['summaries'][name] = future.result()
+                slots[name].info(f"**Property Summary:**\n{run['summaries'][name]}")
+    return run
+
+def show_run(user_preferences, run):
+    """Draws a finished run again from session state, without searching or calling Gemini."""
+    st.info(f"Searching for: {build_search_query(user_preferences)}")
+    show_locality_information(run['locality'])
+    if not run['search_results']:
+        st.warning("No search results found based on your preferences.")
     else:
-        st.info("No significant locality information found online to summarize.")
-
-    return locality_summary
-
-def get_builder_information(builder_name):
-    builder_summary = ""
-    if builder_name:
-        st.subheader(f"Builder Information for {builder_name}")
-        ddgs = DDGS()
-        builder_info = {}
-        all_snippets = []
-        queries = [
-            f"{builder_name} reputation",
-            f"{builder_name} past projects",
-            f"{builder_name} reviews"
-        ]
-        for query in queries:
-            results = list(ddgs.text(query, region='in-mh', max_results=1)) # Limiting to 1 for brevity
-            if results:
-                for result in results:
-                    all_snippets.append(result['body'])
-                    time.sleep(1)
-                builder_info[query] = results
-            else:
-                builder_info[query] = []
-                time.sleep(1)
-
-        if all_snippets:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            prompt = f"""You are a helpful AI assistant summarizing information about a property builder named {builder_name}. Based on the following information found on the internet, provide a concise summary of potential pros and cons for a buyer.
-
-Information:
-{' '.join(all_snippets)}
-
-Summary of potential pros:
--
-
-Summary of potential cons:
--
-"""
-            try:
-                response = model.generate_content(prompt)
-                builder_summary = response.text.strip()
-                st.info(f"Builder Summary:\n{builder_summary}")
-            except Exception as e:
-                st.error(f"Error summarizing builder information: {e}")
-        else:
-            st.info("No significant builder information found online to summarize.")
-
-    return builder_summary
-
-def generate_property_summary(user_preferences, comparison_points):
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    summary_prompt = f"""Based on your preferences:
-Location: {user_preferences.get('location')}
-Budget: {user_preferences.get('budget')}
-Carpet Area: {user_preferences.get('carpet_area')} sq ft
-Floor Preference: {user_preferences.get('floor_preference')}
-Preferred Amenities: {user_preferences.get('preferred_amenities')}
-Financing Options: {user_preferences.get('financing')}
-
-And the following comparison points for this property:
-{' '.join(comparison_points)}
-
-Provide a short, concise summary of how well this property aligns with the user's overall preferences, highlighting potential pros and cons.
-"""
-    try:
-        response = model.generate_content(summary_prompt)
-        property_summary = response.text.strip()
-        return property_summary
-    except Exception as e:
-        return f"Error generating property summary: {e}"
+        show_analysis(run['search_results'], run['listings'], run['analyses'], run['out_of_budget'])
+    if run['ranked_properties']:
+        st.subheader("Top 3 Property Recommendations")
+    else:
+        st.info("No suitable properties found based on your preferences.")
+    for i, prop in enumerate(run['ranked_properties'][:3]):
+        show_recommendation(i, prop)
+        show_builder_information(run['builders'][f"builder:{i}"])
+        st.info(f"**Property Summary:**\n{run['summaries'][f'summary:{i}']}")
+        st.write("---")
 
 # Streamlit App
 st.title("AI Property Assistant")
 st.write("Enter your preferences to find your dream property in Mumbai!")
+debug_trace = st.sidebar.checkbox("Show debug trace", help="Per-stage timings, Gemini token counts and cache hits for each search")
 
 with st.form("user_preferences"):
     location = st.text_input("Preferred Location in Mumbai", "Chembur")
@@ -383,78 +201,31 @@ with st.form("user_preferences"):
     financing = st.text_input("Financing Options (e.g., Pre-approved Loan)", "None")
     submitted = st.form_submit_button("Find Properties")
 
-if submitted:
-    user_preferences = {
-        'location': location,
-        'budget': budget,
-        'carpet_area': carpet_area,
-        'floor_preference': floor_preference,
-        'preferred_amenities': preferred_amenities,
-        'financing': financing
-    }
-
-    with st.spinner("Fetching locality information..."):
-        locality_summary = get_locality_information(user_preferences['location'])
-
-    with st.spinner("Searching for properties..."):
-        search_results = search_properties(user_preferences)
-
-    analyzed_properties = []
-    if search_results:
-        st.subheader("Analyzing Properties...")
-        with st.spinner("Analyzing properties using AI..."):
-            num_results_to_analyze = 3 # Limit for Streamlit demo
-            for i, result in enumerate(search_results[:num_results_to_analyze]):
-                st.write(f"Analyzing property {i+1}: {result['title']}")
-                analysis = analyze_property_with_gemini_with_retry(result)
-                if not analysis.get("error"):
-                    analyzed_properties.append(analysis)
-                else:
-                    st.error(f"Analysis failed for: {result['title']} - {analysis.get('error')}")
-                time.sleep(1) # Be mindful of API rate limits
-    else:
-        st.warning("No search results found based on your preferences.")
-
-    ranked_properties = []
-    if analyzed_properties and search_results:
-        with st.spinner("Comparing properties..."):
-            compared_properties = compare_properties(analyzed_properties, user_preferences, search_results[:len(analyzed_properties)])
-
-            def calculate_score(comparison_details):
-                score = 0
-                for point in comparison_details['comparison_points']:
-                    if "Matches preferred location" in point:
-                        score += 5
-                    elif "Potentially within budget" in point:
-                        score += 4
-                    elif "Close to preferred area" in point:
-                        score += 3
-                    elif "Includes preferred amenities" in point:
-                        score += 2
-                    elif "Mentions preferred floor" in point:
-                        score += 1
-                return score
-
-            for i, prop in enumerate(compared_properties):
-                score = calculate_score(prop)
-                prop['score'] = score
-                prop['search_result'] = search_results[i] # Store original search result for link
-                ranked_properties.append(prop)
-
-            ranked_properties.sort(key=lambda x: x['score'], reverse=True)
-
-    if ranked_properties:
-        st.subheader("Top 3 Property Recommendations")
-        for i, prop in enumerate(ranked_properties[:3]):
-            st.markdown(f"### Recommendation {i + 1}")
-            st.write(f"**Property:** {prop['search_result']['title']}")
-            st.write(f"**Link:** {prop['search_result']['href']}")
-
-            builder_name = prop['analysis'].get('builder', 'Not mentioned')
-            get_builder_information(builder_name)
-
-            property_summary = generate_property_summary(user_preferences, prop['comparison_points'])
-            st.info(f"**Property Summary:**\n{property_summary}")
-            st.write("---")
-    else:
-        st.info("No suitable properties found based on your preferences.")
\ No newline at end of file
+user_preferences = {
+    'location': location,
+    'budget': budget,
+    'carpet_area': carpet_area,
+    'floor_preference': floor_preference,
+    'preferred_amenities': preferred_amenities,
+    'financing': financing
+}
+
+# Streamlit reruns this script on every interaction. Runs are kept in session state keyed by
+# their preferences, so a rerun (or resubmitting the same preferences) redraws the stored
+# results instead of searching and calling Gemini again.
+runs = st.session_state.setdefault("runs", {})
+run_key = tuple(sorted(user_preferences.items()))
+if submitted and run_key not in runs:
+    with tracing.start_trace("recommendation") as trace:
+        run = run_pipeline(user_preferences)
+    run['trace'] = trace
+    runs[run_key] = run
+    while len(runs) > SESSION_RUNS_KEPT:
+        runs.pop(next(iter(runs)))
+elif run_key in runs:
+    run = runs.pop(run_key)
+    runs[run_key] = run # Most recently shown runs are evicted last
+    show_run(user_preferences, run)
+
+if debug_trace and run_key in runs:
+    show_trace(runs[run_key]['trace'])
\ No newline at end of file
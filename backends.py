@@ -0,0 +1,263 @@
+"""Where search results and Gemini responses come from.
+
+A search backend has `text(query, region, max_results)` returning DuckDuckGo-style result
+dicts; an LLM backend has `model(name)` returning an object with the google.generativeai
+`generate_content(prompt, stream=False, request_options=None)` interface. The pipeline only
+reaches the outside world through search_backend() and llm_backend().
+
+configure() picks the backends from a spec (default: the PROPERTY_FINDER_BACKEND
+environment variable, else "live"):
+
+    live          DuckDuckGo and Gemini
+    fake          deterministic local stand-ins (see fake_backends)
+    record:DIR    live, with every response appended to cassettes in DIR
+    replay:DIR    responses served from the cassettes in DIR, with no network access
+"""
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+from cache import make_key
+
+BACKEND_ENV = "PROPERTY_FINDER_BACKEND"
+SEARCH_CASSETTE = "search.jsonl"
+GEMINI_CASSETTE = "gemini.jsonl"
+
+_lock = threading.Lock()
+_search_backend = None
+_llm_backend = None
+_configured_spec = None
+
+
+class CassetteMiss(KeyError):
+    pass
+
+
+class DuckDuckGoSearch:
+    """DuckDuckGo text search. Each thread keeps one DDGS, whose HTTP client holds its
+    connections open between queries; the search executor's threads live for the whole process.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _ddgs(self):
+        # DDGS keeps its own HTTP client, so give each worker thread its own instance.
+        if not hasattr(self._local, "ddgs"):
+            from duckduckgo_search import DDGS
+            self._local.ddgs = DDGS()
+        return self._local.ddgs
+
+    def text(self, query, region, max_results):
+        return list(self._ddgs().text(query, region=region, max_results=max_results))
+
+
+class GeminiModels:
+    """google.generativeai models, one shared handle per model name so its client and
+    connections are reused by every caller. `api_key` (a string, or a callable returning one)
+    is only read and passed to genai.configure() when the first model is requested.
+    """
+
+    def __init__(self, api_key=None):
+        self._api_key = api_key
+        self._configured = api_key is None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, name):
+        with self._lock:
+            if name not in self._models:
+                # Importing google.generativeai takes about a second, so it waits for the first call.
+                import google.generativeai as genai
+                if not self._configured:
+                    genai.configure(api_key=self._api_key() if callable(self._api_key) else self._api_key)
+                    self._configured = True
+                self._models[name] = genai.GenerativeModel(name)
+            return self._models[name]
+
+
+class Cassette:
+    """Recorded responses in a JSON-lines file, keyed by a hash of the request."""
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry["response"]
+
+    def get(self, key, request):
+        try:
+            return self._entries[key]
+        except KeyError:
+            raise CassetteMiss(f"{self.path} has no recording for {request!r}") from None
+
+    def put(self, key, request, response):
+        with self._lock:
+            self._entries[key] = response
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "request": request, "response": response}, ensure_ascii=False) + "\n")
+
+
+def _search_key(query, region, max_results):
+    return make_key("search", query, region, max_results)
+
+
+def _gemini_key(name, prompt):
+    # Streamed and regular requests share a recording; replay serves either from it.
+    return make_key("gemini", name, prompt)
+
+
+class RecordingSearch:
+    def __init__(self, inner, cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def text(self, query, region, max_results):
+        results = self.inner.text(query, region, max_results)
+        self.cassette.put(_search_key(query, region, max_results), {"query": query, "region": region, "max_results": max_results}, results)
+        return results
+
+
+class ReplaySearch:
+    def __init__(self, cassette):
+        self.cassette = cassette
+
+    def text(self, query, region, max_results):
+        return self.cassette.get(_search_key(query, region, max_results), query)
+
+
+class Response:
+    """The parts of a google.generativeai response the pipeline reads.
+
+    Iterating it yields the streamed chunks, each with a `text`.
+    """
+
+    def __init__(self, text, prompt_tokens=0, response_tokens=0, chunks=None):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=response_tokens)
+        self._chunks = chunks if chunks is not None else [text]
+
+    def __iter__(self):
+        return (SimpleNamespace(text=chunk) for chunk in self._chunks)
+
+
+def _usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+
+class _RecordingModel:
+    def __init__(self, name, inner, cassette):
+        self.name = name
+        self.inner = inner
+        self.cassette = cassette
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        kwargs = {"request_options": request_options} if request_options else {}
+        response = self.inner.generate_content(prompt, stream=stream, **kwargs)
+        if stream:
+            return self._record_stream(prompt, response)
+        self._put(prompt, [response.text], response)
+        return response
+
+    def _record_stream(self, prompt, response):
+        chunks = []
+        for chunk in response:
+            chunks.append(chunk.text)
+            yield chunk
+        self._put(prompt, chunks, response)
+
+    def _put(self, prompt, chunks, response):
+        prompt_tokens, response_tokens = _usage(response)
+        self.cassette.put(_gemini_key(self.name, prompt), {"model": self.name, "prompt": prompt},
+                          {"chunks": chunks, "prompt_tokens": prompt_tokens, "response_tokens": response_tokens})
+
+
+class RecordingModels:
+    def __init__(self, inner, cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def model(self, name):
+        return _RecordingModel(name, self.inner.model(name), self.cassette)
+
+
+class _ReplayModel:
+    def __init__(self, name, cassette):
+        self.name = name
+        self.cassette = cassette
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        recorded = self.cassette.get(_gemini_key(self.name, prompt), prompt[:80])
+        return Response("".join(recorded["chunks"]), recorded["prompt_tokens"], recorded["response_tokens"], recorded["chunks"])
+
+
+class ReplayModels:
+    def __init__(self, cassette):
+        self.cassette = cassette
+
+    def model(self, name):
+        return _ReplayModel(name, self.cassette)
+
+
+def from_spec(spec, gemini_api_key=None):
+    """Returns the (search, llm) backends a spec names; see the module docstring."""
+    mode, _, directory = spec.partition(":")
+    if mode == "live":
+        return DuckDuckGoSearch(), GeminiModels(gemini_api_key)
+    if mode == "fake":
+        from fake_backends import FakeModels, FakeSearch
+        return FakeSearch(), FakeModels()
+    if mode in ("record", "replay") and directory:
+        search_cassette = Cassette(os.path.join(directory, SEARCH_CASSETTE))
+        gemini_cassette = Cassette(os.path.join(directory, GEMINI_CASSETTE))
+        if mode == "record":
+            return RecordingSearch(DuckDuckGoSearch(), search_cassette), RecordingModels(GeminiModels(gemini_api_key), gemini_cassette)
+        return ReplaySearch(search_cassette), ReplayModels(gemini_cassette)
+    raise ValueError(f"Unknown backend {spec!r}; expected live, fake, record:DIR or replay:DIR")
+
+
+def configure(spec=None, gemini_api_key=None):
+    """Selects the process's backends. Repeat calls with the same spec keep the current ones,
+    so this is safe to call on every Streamlit rerun.
+    """
+    global _search_backend, _llm_backend, _configured_spec
+    spec = spec or os.environ.get(BACKEND_ENV, "live")
+    with _lock:
+        if spec != _configured_spec:
+            _search_backend, _llm_backend = from_spec(spec, gemini_api_key)
+            _configured_spec = spec
+
+
+def set_backends(search=None, llm=None):
+    """Installs backend objects directly, e.g. fakes configured by a benchmark."""
+    global _search_backend, _llm_backend, _configured_spec
+    with _lock:
+        if search is not None:
+            _search_backend = search
+        if llm is not None:
+            _llm_backend = llm
+        _configured_spec = None
+
+
+def search_backend():
+    if _search_backend is None:
+        configure()
+    return _search_backend
+
+
+def llm_backend():
+    if _llm_backend is None:
+        configure()
+    return _llm_backend
@@ -0,0 +1,116 @@
+"""Runs the recommendation pipeline headless over many preference profiles.
+
+    GEMINI_API_KEY=... python batch.py profiles.jsonl -o recommendations.jsonl --workers 4
+
+--backend (or PROPERTY_FINDER_BACKEND) selects live, fake, record:DIR or replay:DIR backends;
+see backends.py. GEMINI_API_KEY is only needed when Gemini is actually called.
+
+Each input line is a JSON object of preferences (location, budget, carpet_area,
+floor_preference, preferred_amenities, financing) and may carry an "id". Each output line
+holds that id, the preferences, the ranked recommendations and the profile's latency, or an
+"error". A throughput/latency/API-call report is printed to stderr when the run finishes.
+
+--trace writes every profile's spans as JSON lines, and --metrics writes the run's stage
+latency histograms and API/token/cache counters in Prometheus text format.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import api_calls
+import backends
+import tracing
+from pipeline import get_locality_information, recommend
+
+PREFERENCE_KEYS = ('location', 'budget', 'carpet_area', 'floor_preference', 'preferred_amenities', 'financing')
+
+
+def read_profiles(path):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                profile = json.loads(line)
+                profile.setdefault("id", line_number)
+                yield profile
+
+
+def process_profile(profile, top_n, with_summaries, with_locality):
+    preferences = {key: str(profile.get(key, '')) for key in PREFERENCE_KEYS}
+    record = {"id": profile["id"], "preferences": preferences}
+    start = time.perf_counter()
+    with tracing.start_trace("profile", profile_id=profile["id"]) as trace:
+        try:
+            record["recommendations"] = recommend(preferences, top_n=top_n, with_summaries=with_summaries)
+            if with_locality:
+                record["locality"] = get_locality_information(preferences['location'] or 'Mumbai')
+        except Exception as e:
+            logging.exception("Profile %s failed", profile["id"])
+            record["error"] = str(e)
+    record["latency_s"] = round(time.perf_counter() - start, 3)
+    return record, trace
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def report(records, elapsed, calls, out=sys.stderr):
+    latencies = sorted(record["latency_s"] for record in records)
+    failed = sum(1 for record in records if "error" in record)
+    print(f"profiles: {len(records)} ({failed} failed) in {elapsed:.1f}s", file=out)
+    print(f"throughput: {len(records) / elapsed if elapsed else 0:.2f} profiles/s", file=out)
+    print("latency: " + ", ".join(f"p{int(p * 100)} {percentile(latencies, p):.2f}s" for p in (0.5, 0.9, 0.95, 0.99)), file=out)
+    print("api calls: " + (", ".join(f"{api} {count}" for api, count in sorted(calls.items())) or "none"), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute property recommendations for preference profiles.")
+    parser.add_argument("profiles", help="JSONL file with one preference profile per line")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for the results (default: stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="profiles processed concurrently")
+    parser.add_argument("--top", type=int, default=3, help="recommendations kept per profile")
+    parser.add_argument("--summaries", action="store_true", help="add a Gemini summary to each recommendation")
+    parser.add_argument("--locality", action="store_true", help="add the locality summary to each profile")
+    parser.add_argument("--backend", help="live, fake, record:DIR or replay:DIR (default: $PROPERTY_FINDER_BACKEND or live)")
+    parser.add_argument("--trace", help="JSONL file for the spans of every profile")
+    parser.add_argument("--metrics", help="file for a Prometheus-style metrics dump of the run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    backends.configure(args.backend, gemini_api_key=lambda: os.environ["GEMINI_API_KEY"])
+
+    profiles = list(read_profiles(args.profiles))
+    calls_before = api_calls.snapshot()
+    start = time.perf_counter()
+    records = []
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    trace_out = open(args.trace, "w", encoding="utf-8") if args.trace else None
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="profile") as pool:
+            # map() keeps output in input order; each line is written as soon as it is next in order.
+            for record, trace in pool.map(lambda profile: process_profile(profile, args.top, args.summaries, args.locality), profiles):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if trace_out is not None:
+                    trace_out.write(trace.to_jsonl())
+                records.append(record)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if trace_out is not None:
+            trace_out.close()
+    report(records, time.perf_counter() - start, api_calls.since(calls_before))
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(tracing.prometheus_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Accuracy and throughput of price_parser against a corpus of real listing strings.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parsing [--iterations N]
+
+Accuracy is the share of corpus strings parsed to their expected (min, max). Throughput is
+reported cold (memoization cleared before every pass) and warm (served from the LRU).
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+from price_parser import parse_area, parse_price
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "listing_strings.jsonl")
+PARSERS = {"price": parse_price, "area": parse_area}
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _matches(actual, expected):
+    for a, e in zip(actual, expected):
+        if e is None or a is None:
+            if a is not e:
+                return False
+        elif not (a == e or math.isclose(a, e, rel_tol=1e-6)):
+            return False
+    return True
+
+
+def check_accuracy(corpus):
+    failures = []
+    for case in corpus:
+        actual = PARSERS[case["kind"]](case["text"])
+        if not _matches(actual, case["expected"]):
+            failures.append((case, actual))
+    return failures
+
+
+def measure_throughput(corpus, iterations, cold):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if cold:
+            parse_price.cache_clear()
+            parse_area.cache_clear()
+        for case in corpus:
+            PARSERS[case["kind"]](case["text"])
+    elapsed = time.perf_counter() - start
+    return iterations * len(corpus) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failures = check_accuracy(corpus)
+    print(f"accuracy: {len(corpus) - len(failures)}/{len(corpus)} ({100 * (1 - len(failures) / len(corpus)):.1f}%)")
+    for case, actual in failures:
+        print(f"  {case['kind']:5} {case['text']!r}: expected {case['expected']}, got {list(actual)}")
+    print(f"cold: {measure_throughput(corpus, args.iterations, cold=True):,.0f} strings/s")
+    print(f"warm: {measure_throughput(corpus, args.iterations, cold=False):,.0f} strings/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""End-to-end latency and throughput of the recommendation pipeline on simulated backends.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline [--sessions 16] [--concurrency 4] [--llm-latency 0.8]
+        [--llm-rate-limit 0.02] [--save results.json] [--baseline results.json]
+
+Each session runs what one app submission runs (pipeline.run_recommendation): the locality
+lookup alongside the progressive search, then the builder lookup and summary for each of the top three. Sessions
+run concurrently against fake DuckDuckGo/Gemini backends (or --backend replay:DIR for
+recorded responses), and the production rate limits apply unless --gemini-rate or
+--search-rate lift them. The caches start empty in a temporary directory unless
+PROPERTY_FINDER_CACHE_PATH points at a warm one.
+
+With --baseline the run exits non-zero if p95/p99 latency or throughput are more than
+--tolerance worse than the saved results.
+"""
+import os
+import tempfile
+
+# Must be set before the pipeline modules import cache.CACHE_PATH.
+os.environ.setdefault("PROPERTY_FINDER_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-pipeline-"), "cache.sqlite3"))
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import api_calls
+import backends
+import tracing
+from batch import percentile
+from fake_backends import AMENITIES, LOCATIONS, FakeModels, FakeSearch
+from llm import gemini_limiter
+from pipeline import run_recommendation
+from search_executor import get_search_executor
+
+BUDGETS = ("80 Lakh - 1.2 Cr", "1 Cr - 1.5 Cr", "1.5 Cr - 2.5 Cr", "under 90 L", "2 Cr onwards")
+REPORTED_STAGES = ("find_properties", "analysis", "compare", "locality", "builder", "property_summary", "search.query", "gemini.generate")
+
+
+def make_profiles(count, distinct, seed):
+    """`count` preference profiles cycling through `distinct` generated ones."""
+    rng = random.Random(seed)
+    unique = [{
+        'location': rng.choice(LOCATIONS),
+        'budget': rng.choice(BUDGETS),
+        'carpet_area': str(rng.randrange(500, 1500, 50)),
+        'floor_preference': rng.choice(("Any", "high", "low")),
+        'preferred_amenities': ", ".join(rng.sample(AMENITIES, 2)),
+        'financing': "None",
+    } for _ in range(distinct)]
+    return [unique[i % distinct] for i in range(count)]
+
+
+def run_session(preferences):
+    """One app submission, through the same pipeline.run_recommendation graph app.py uses.
+    Returns (seconds, trace, error).
+    """
+    start = time.perf_counter()
+    error = None
+    with tracing.start_trace("session") as trace:
+        for name, future in run_recommendation(preferences, top_k=3):
+            if future.exception() is not None:
+                error = error or f"{name}: {future.exception()}"
+    return time.perf_counter() - start, trace, error
+
+
+def summarize(latencies, elapsed, traces, errors, calls):
+    latencies = sorted(latencies)
+    stages = defaultdict(list)
+    retries = 0
+    for trace in traces:
+        for span in trace.spans:
+            stages[span.name].append(span.duration)
+            if span.name == "gemini.generate":
+                retries += span.attributes.get("retries", 0)
+    return {
+        "sessions": len(latencies),
+        "failed": len(errors),
+        "elapsed_s": elapsed,
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_s": percentile(latencies, 0.5),
+        "p95_s": percentile(latencies, 0.95),
+        "p99_s": percentile(latencies, 0.99),
+        "api_calls": calls,
+        "gemini_retries": retries,
+        "stages": {name: {"count": len(durations), "p50_s": percentile(sorted(durations), 0.5), "p95_s": percentile(sorted(durations), 0.95)}
+                   for name, durations in stages.items() if name in REPORTED_STAGES},
+    }
+
+
+def print_summary(summary, out=sys.stdout):
+    print(f"sessions: {summary['sessions']} ({summary['failed']} failed) in {summary['elapsed_s']:.1f}s", file=out)
+    print(f"throughput: {summary['throughput_per_s']:.2f} sessions/s", file=out)
+    print(f"latency: p50 {summary['p50_s']:.2f}s, p95 {summary['p95_s']:.2f}s, p99 {summary['p99_s']:.2f}s", file=out)
+    print("api calls: " + (", ".join(f"{api} {count}" for api, count in sorted(summary['api_calls'].items())) or "none")
+          + f" ({summary['gemini_retries']} Gemini retries)", file=out)
+    for name in REPORTED_STAGES:
+        if name in summary["stages"]:
+            stage = summary["stages"][name]
+            print(f"  {name:18} n={stage['count']:<5} p50 {stage['p50_s']:.3f}s  p95 {stage['p95_s']:.3f}s", file=out)
+
+
+def regressions(summary, baseline, tolerance):
+    problems = []
+    for key in ("p95_s", "p99_s"):
+        if summary[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key} {summary[key]:.2f}s vs baseline {baseline[key]:.2f}s")
+    if summary["throughput_per_s"] < baseline["throughput_per_s"] * (1 - tolerance):
+        problems.append(f"throughput {summary['throughput_per_s']:.2f}/s vs baseline {baseline['throughput_per_s']:.2f}/s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--distinct", type=int, help="distinct preference profiles (default: one per session)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", help="replay:DIR to use recorded responses instead of the fakes")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="seconds per fake search")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per fake Gemini response")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency varies by up to this fraction either way")
+    parser.add_argument("--search-rate-limit", type=float, default=0.0, help="share of fake searches that are rate limited")
+    parser.add_argument("--llm-rate-limit", type=float, default=0.02, help="share of fake Gemini calls that raise TooManyRequests")
+    parser.add_argument("--gemini-rate", type=float, help="override the Gemini requests/second limit")
+    parser.add_argument("--search-rate", type=float, help="override the search requests/second limit")
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare against results written earlier with --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(levelname)s %(name)s: %(message)s")
+    if args.backend:
+        backends.configure(args.backend)
+    else:
+        backends.set_backends(
+            search=FakeSearch(args.search_latency, args.jitter, args.search_rate_limit, args.seed),
+            llm=FakeModels(args.llm_latency, args.jitter, args.llm_rate_limit, seed=args.seed),
+        )
+    if args.gemini_rate:
+        gemini_limiter.set_max_rate(args.gemini_rate)
+    if args.search_rate:
+        get_search_executor().set_rate(args.search_rate)
+
+    profiles = make_profiles(args.sessions, args.distinct or args.sessions, args.seed)
+    calls_before = api_calls.snapshot()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="session") as pool:
+        results = list(pool.map(run_session, profiles))
+    elapsed = time.perf_counter() - start
+
+    errors = [error for _, _, error in results if error]
+    summary = summarize([seconds for seconds, _, _ in results], elapsed, [trace for _, trace, _ in results], errors, api_calls.since(calls_before))
+    print_summary(summary)
+    for error in errors[:5]:
+        print(f"  error: {error}")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(dict(summary, settings=vars(args)), f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = regressions(summary, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.environ.get("PROPERTY_FINDER_CACHE_PATH", os.path.join(".cache", "property_finder.sqlite3"))
+
+
+def make_key(*parts):
+    """Content address for a cache entry: a SHA-256 over the given parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class PersistentCache:
+    """JSON values in SQLite with a per-entry TTL and least-recently-used eviction.
+
+    Several caches can share one database file; each keeps its rows under its own namespace.
+    """
+
+    def __init__(self, namespace, ttl, max_entries, path=CACHE_PATH):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+        return self._conn
+
+    def get(self, key, ttl=None):
+        """Returns the cached value, or None on a miss or an expired entry."""
+        entry = self.get_entry(key, ttl)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key, ttl=None):
+        """Like get(), but returns a (value, created_at) pair so callers can tell its age."""
+        with tracing.span("cache.lookup", cache=self.namespace) as span:
+            entry = self._get_entry(key, ttl)
+            span.set(hit=entry is not None)
+        tracing.count("cache_lookups_total", cache=self.namespace, result="miss" if entry is None else "hit")
+        return entry
+
+    def _get_entry(self, key, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is not None and now - row[1] > ttl:
+                    conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key),
+                )
+                self.hits += 1
+                return json.loads(row[0]), row[1]
+            except sqlite3.Error as e:
+                logger.warning("Cache read failed (%s): %s", self.namespace, e)
+                self.misses += 1
+                return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), now, now),
+                )
+                self._evict(conn)
+            except sqlite3.Error as e:
+                logger.warning("Cache write failed (%s): %s", self.namespace, e)
+
+    def _evict(self, conn):
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+    def stats(self):
+        return {"namespace": self.namespace, "hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+
+class MemoryLRU:
+    """Small in-process LRU with per-lookup TTL, meant to sit in front of a PersistentCache."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.time() - stored_at > ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._entries[key] = (value, time.time() if stored_at is None else stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution of `fn`."""
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
@@ -0,0 +1,167 @@
+"""Near-duplicate detection for listings syndicated across several portals.
+
+Each listing's title and body are normalized (case, punctuation and portal names dropped)
+and reduced to a 64-bit SimHash over word shingles. Listings whose fingerprints differ in
+at most MAX_HAMMING_DISTANCE bits are candidates, confirmed by the exact Jaccard similarity
+of their shingle sets. Candidates whose price, area (read only from figures with a unit) or
+bedroom count disagree are never merged, since they are different units in the same
+project. Duplicates group transitively, but never into a cluster whose facts disagree.
+"""
+import hashlib
+import re
+
+from price_parser import parse_area, parse_price
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 2
+MAX_HAMMING_DISTANCE = 18
+MIN_JACCARD = 0.6
+
+PORTAL_WORDS = frozenset({
+    "99acres", "magicbricks", "housing", "nobroker", "makaan", "squareyards", "square", "yards",
+    "commonfloor", "proptiger", "nestaway", "anarock", "com", "www", "in",
+})
+
+
+def _words(text):
+    return [word for word in re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", text.lower()) if word not in PORTAL_WORDS]
+
+
+def shingles(text):
+    words = _words(text)
+    if len(words) < SHINGLE_SIZE:
+        return set(words)
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def simhash(features):
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=FINGERPRINT_BITS // 8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _facts(text):
+    # Only figures with a unit count; bare numbers ("Posted 3 days ago") differ between portals.
+    bedrooms = re.search(r"(\d+)\s*bhk", text.lower())
+    return {
+        "price": parse_price(text, allow_bare=False),
+        "area": parse_area(text, allow_bare=False),
+        "bedrooms": bedrooms.group(1) if bedrooms else None,
+    }
+
+
+def _conflicting(a, b):
+    for fact in ("price", "area", "bedrooms"):
+        if a[fact] not in (None, (None, None)) and b[fact] not in (None, (None, None)) and a[fact] != b[fact]:
+            return True
+    return False
+
+
+def cluster(search_results, known=()):
+    """Returns clusters of near-duplicate results as lists of indices into `search_results`,
+    ordered by their first member's position.
+
+    `known` lists groups of indices already known to be one cluster; they start merged, and
+    their facts count when deciding what else may join them.
+    """
+    texts = [f"{result['title']}\n{result['body']}" for result in search_results]
+    features = [shingles(text) for text in texts]
+    fingerprints = [simhash(feature) for feature in features]
+    facts = [_facts(text) for text in texts]
+
+    parent = list(range(len(search_results)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # The known facts of each cluster, kept on its root. A union is refused when any fact of
+    # the two clusters disagrees, so duplicates never join two different units transitively.
+    cluster_facts = [dict(fact) for fact in facts]
+
+    def union(root_i, root_j):
+        parent[root_i] = root_j
+        for fact, value in cluster_facts[root_i].items():
+            if cluster_facts[root_j][fact] in (None, (None, None)):
+                cluster_facts[root_j][fact] = value
+
+    for group in known:
+        for i in group[1:]:
+            if root(i) != root(group[0]):
+                union(root(i), root(group[0]))
+
+    for i in range(len(search_results)):
+        for j in range(i):
+            if bin(fingerprints[i] ^ fingerprints[j]).count("1") > MAX_HAMMING_DISTANCE:
+                continue
+            root_i, root_j = root(i), root(j)
+            if root_i == root_j or _jaccard(features[i], features[j]) < MIN_JACCARD \
+                    or _conflicting(cluster_facts[root_i], cluster_facts[root_j]):
+                continue
+            union(root_i, root_j)
+
+    clusters = {}
+    for i in range(len(search_results)):
+        clusters.setdefault(root(i), []).append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def dedupe(search_results):
+    """One result per cluster of near-duplicates, in search order.
+
+    The representative is the member with the longest text, copied with a 'duplicates' key
+    listing the other members' search results.
+    """
+    return [_representative([search_results[i] for i in members]) for members in cluster(search_results)]
+
+
+def _representative(results):
+    best = max(results, key=lambda result: len(result['title']) + len(result['body']))
+    representative = dict(best)
+    representative['duplicates'] = [result for result in results if result is not best]
+    return representative
+
+
+def extend(listings, search_results):
+    """Adds more search results to listings that dedupe() returned.
+
+    Results whose URL was already seen are dropped, and near-duplicates of an existing
+    listing are appended to its 'duplicates'. The rest are deduplicated among themselves
+    and returned as new listings; existing representatives never change.
+    """
+    seen = {result['href'] for listing in listings for result in [listing] + listing['duplicates']}
+    fresh = []
+    for result in search_results:
+        if result['href'] not in seen:
+            seen.add(result['href'])
+            fresh.append(result)
+
+    # Existing listings are clustered with their duplicates, whose facts count too.
+    combined = []
+    owners = []
+    known = []
+    for listing_number, listing in enumerate(listings):
+        known.append(list(range(len(combined), len(combined) + 1 + len(listing['duplicates']))))
+        combined += [listing] + listing['duplicates']
+        owners += [listing_number] * (1 + len(listing['duplicates']))
+    existing_count = len(combined)
+    combined += fresh
+
+    new_listings = []
+    for members in cluster(combined, known):
+        existing = [owners[i] for i in members if i < existing_count]
+        added = [combined[i] for i in members if i >= existing_count]
+        if existing:
+            listings[existing[0]]['duplicates'].extend(added)
+        elif added:
+            new_listings.append(_representative(added))
+    return new_listings
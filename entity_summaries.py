@@ -0,0 +1,92 @@
+import re
+import string
+
+from cache import PersistentCache, make_key
+
+SUMMARY_TTL = 14 * 24 * 60 * 60
+SUMMARY_MAX_ENTRIES = 2000
+
+# Normalized spelling -> canonical display name. Lookups happen after normalize_name(),
+# so keys here are case-folded with single spaces and no punctuation.
+LOCALITY_ALIASES = {
+    "chembur east": "Chembur",
+    "chembur west": "Chembur",
+    "chembur e": "Chembur",
+    "chembur w": "Chembur",
+    "bkc": "Bandra Kurla Complex",
+    "bandra kurla": "Bandra Kurla Complex",
+    "navi mumbai": "Navi Mumbai",
+    "new bombay": "Navi Mumbai",
+    "powai lake": "Powai",
+    "hiranandani powai": "Powai",
+    "lower parel west": "Lower Parel",
+}
+
+BUILDER_ALIASES = {
+    "lodha": "Lodha Group",
+    "lodha developers": "Lodha Group",
+    "macrotech developers": "Lodha Group",
+    "godrej": "Godrej Properties",
+    "hiranandani": "Hiranandani Group",
+    "hiranandani developers": "Hiranandani Group",
+    "kalpataru": "Kalpataru",
+    "oberoi": "Oberoi Realty",
+    "runwal": "Runwal Group",
+    "runwal developers": "Runwal Group",
+    "l&t": "L&T Realty",
+    "l and t realty": "L&T Realty",
+}
+
+# Corporate suffixes that do not change which builder is meant.
+_BUILDER_SUFFIXES = re.compile(r"\b(pvt|private|ltd|limited|llp|inc|co)\b")
+
+
+def normalize_name(name):
+    name = name.casefold()
+    name = re.sub(r"[.,()\-]", " ", name)
+    return " ".join(name.split())
+
+
+def canonical_locality(name):
+    """Returns (key, display name) for a locality, folding aliases onto one entity."""
+    normalized = normalize_name(name)
+    display = LOCALITY_ALIASES.get(normalized) or string.capwords(name)
+    return normalize_name(display), display
+
+
+def canonical_builder(name):
+    """Returns (key, display name) for a builder, ignoring corporate suffixes and aliases."""
+    normalized = " ".join(_BUILDER_SUFFIXES.sub(" ", normalize_name(name)).split())
+    display = BUILDER_ALIASES.get(normalized, " ".join(name.split()))
+    return " ".join(_BUILDER_SUFFIXES.sub(" ", normalize_name(display)).split()), display
+
+
+def snippets_version(snippets):
+    # Order-insensitive, since concurrent searches may return snippets in any order.
+    return make_key(*sorted(snippets))
+
+
+class SummaryStore:
+    """Gemini summaries per entity, reused until the snippets behind them change or expire."""
+
+    def __init__(self, cache=None):
+        self._cache = cache or PersistentCache("entity_summaries", SUMMARY_TTL, SUMMARY_MAX_ENTRIES)
+
+    def get_or_create(self, kind, key, snippets, generate):
+        """Returns the stored summary for (kind, key) if it was built from the same snippets,
+        otherwise calls generate() and stores its result. Exceptions from generate() propagate.
+        """
+        cache_key = f"{kind}:{key}"
+        version = snippets_version(snippets)
+        entry = self._cache.get(cache_key)
+        if entry is not None and entry["snippets_version"] == version:
+            return entry["summary"]
+        summary = generate()
+        self._cache.set(cache_key, {"snippets_version": version, "summary": summary})
+        return summary
+
+    def stats(self):
+        return self._cache.stats()
+
+
+summary_store = SummaryStore()
@@ -0,0 +1,197 @@
+"""Deterministic stand-ins for DuckDuckGo and Gemini, for benchmarks and offline runs.
+
+FakeSearch invents listings (and locality/builder snippets) from a hash of the query, so
+the same query always returns the same results; some listings are the same unit syndicated
+on another portal. FakeModels answers the pipeline's prompts:
+analysis prompts get JSON read back out of those listings, anything else gets a short
+summary. Both sleep for a configurable latency and fail with the real libraries' rate-limit
+errors at a configurable rate.
+"""
+import json
+import random
+import re
+import threading
+import time
+
+from backends import Response
+from cache import make_key
+
+LOCATIONS = ("Chembur", "Powai", "Andheri West", "Bandra West", "Thane West", "Goregaon East", "Mulund", "Borivali")
+BUILDERS = ("Lodha Group", "Godrej Properties", "Oberoi Realty", "Kalpataru", "Hiranandani", "Runwal", "L&T Realty")
+AMENITIES = ("Parking", "Gym", "Swimming Pool", "Clubhouse", "Garden", "Security", "Lift", "Power Backup", "Play Area")
+FLOORS = ("low", "mid", "high", "top")
+PORTALS = ("99acres", "MagicBricks", "Housing.com", "NoBroker", "Makaan")
+NEIGHBOURHOOD_NOTES = (
+    "Close to the railway station",
+    "Walking distance to schools and a hospital",
+    "Near a mall and the metro line",
+    "Quiet street with easy highway access",
+)
+CHARS_PER_TOKEN = 4
+
+
+class _Faults:
+    """Latency and failure injection shared by the fakes."""
+
+    def __init__(self, latency, jitter, error_rate, seed):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            spread = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency * (1 + spread))
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+def _format_price(rupees):
+    if rupees >= 10000000:
+        return f"₹{rupees / 10000000:.2f} Cr"
+    return f"₹{rupees / 100000:.0f} Lakh"
+
+
+class FakeSearch:
+    """Search backend returning invented, query-deterministic results."""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit_rate=0.0, duplicate_rate=0.25, seed=0):
+        self.seed = seed
+        self.duplicate_rate = duplicate_rate
+        self._faults = _Faults(latency, jitter, rate_limit_rate, seed)
+
+    def text(self, query, region, max_results):
+        time.sleep(self._faults.delay())
+        if self._faults.should_fail():
+            from duckduckgo_search.exceptions import RatelimitException
+            raise RatelimitException(f"fake rate limit for {query!r}")
+        listing = re.match(r"property for sale in (.+?)(?: budget | carpet area | floor preference |$)", query)
+        if listing:
+            results = []
+            for i in range(max_results):
+                rng = random.Random(make_key(self.seed, query, i, "portal"))
+                if results and rng.random() < self.duplicate_rate:
+                    results.append(self._syndicated(rng.choice(results), rng.choice(PORTALS), i))
+                else:
+                    results.append(self._listing(listing.group(1), query, i))
+            return results
+        return [self._snippet(query, i) for i in range(max_results)]
+
+    def _listing(self, location, query, i):
+        key = make_key(self.seed, query, i)
+        rng = random.Random(key)
+        bedrooms = rng.choice((1, 2, 2, 3, 3, 4))
+        area = rng.randrange(350, 500, 25) * bedrooms
+        price = area * rng.randrange(12000, 32000, 500)
+        builder = rng.choice(BUILDERS)
+        amenities = rng.sample(AMENITIES, rng.randint(2, 5))
+        body = (f"{bedrooms} BHK apartment in {location} by {builder}; carpet area {area} sq ft; "
+                f"{rng.choice(FLOORS)} floor; price {_format_price(price)}; amenities: {', '.join(amenities)}; "
+                f"{rng.choice(NEIGHBOURHOOD_NOTES)}")
+        portal = rng.choice(PORTALS)
+        return {
+            'title': f"{bedrooms} BHK Flat for Sale in {location} | {builder} - {portal}",
+            'href': f"https://{portal.lower()}.example/{location.lower().replace(' ', '-')}/{key[:12]}",
+            'body': body,
+        }
+
+    def _syndicated(self, original, portal, i):
+        title = original['title'].rsplit(" - ", 1)[0]
+        return {
+            'title': f"{title} - {portal}",
+            'href': f"https://{portal.lower()}.example/{original['href'].rsplit('/', 1)[-1]}-{i}",
+            'body': original['body'],
+        }
+
+    def _snippet(self, query, i):
+        key = make_key(self.seed, query, i)
+        rng = random.Random(key)
+        return {
+            'title': f"{query.title()} - Guide",
+            'href': f"https://guides.example/{key[:12]}",
+            'body': f"{query}: {rng.choice(NEIGHBOURHOOD_NOTES)}. Residents rate it {rng.randint(2, 5)} out of 5.",
+        }
+
+
+def _extract(description):
+    """Reads a FakeSearch listing body back into an analysis dict."""
+    bedrooms = re.match(r"(\d+) BHK", description)
+    builder = re.search(r" by (.+?);", description)
+    area = re.search(r"carpet area (\d+) sq ft", description)
+    amenities = re.search(r"amenities: ([^;]+)", description)
+    price = re.search(r"price ([^;]+)", description)
+    return {
+        "price": price.group(1) if price else None,
+        "area_sqft": {"carpet": f"{area.group(1)} sq ft"} if area else None,
+        "bedrooms": int(bedrooms.group(1)) if bedrooms else None,
+        "bathrooms": int(bedrooms.group(1)) if bedrooms else None,
+        "amenities": [amenity.strip() for amenity in amenities.group(1).split(",")] if amenities else [],
+        "builder": builder.group(1) if builder else None,
+        "builder_reputation_highlights": "",
+        "locality_highlights": description.rsplit("; ", 1)[-1],
+    }
+
+
+class _FakeModel:
+    def __init__(self, name, models):
+        self.name = name
+        self._models = models
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        faults = self._models.faults
+        if faults.should_fail():
+            from google.api_core.exceptions import TooManyRequests
+            raise TooManyRequests("fake quota exceeded")
+        text = self._answer(prompt)
+        prompt_tokens, response_tokens = len(prompt) // CHARS_PER_TOKEN, len(text) // CHARS_PER_TOKEN
+        if not stream:
+            time.sleep(faults.delay())
+            return Response(text, prompt_tokens, response_tokens)
+        words = text.split(" ")
+        size = max(1, len(words) // self._models.stream_chunks)
+        chunks = [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+        return _StreamedResponse(Response(text, prompt_tokens, response_tokens, chunks), faults.delay() / len(chunks))
+
+    def _answer(self, prompt):
+        listings = re.findall(r"^Listing (\d+)\nTitle: .*\nDescription: (.*)$", prompt, re.MULTILINE)
+        if listings:
+            return "```json\n" + json.dumps([dict(_extract(description), listing_index=int(i)) for i, description in listings]) + "\n```"
+        single = re.search(r"^Description: (.*)$", prompt, re.MULTILINE)
+        if single and "JSON object" in prompt:
+            return "```json\n" + json.dumps(_extract(single.group(1))) + "\n```"
+        rng = random.Random(make_key(self._models.seed, prompt))
+        subject = prompt.strip().splitlines()[0][:60]
+        sentences = [f"This is a simulated summary for: {subject}."]
+        sentences += [rng.choice(NEIGHBOURHOOD_NOTES) + "." for _ in range(rng.randint(2, 4))]
+        return " ".join(sentences)
+
+
+class _StreamedResponse:
+    def __init__(self, response, chunk_delay):
+        self._response = response
+        self._chunk_delay = chunk_delay
+        self.text = response.text
+        self.usage_metadata = response.usage_metadata
+
+    def __iter__(self):
+        for chunk in self._response:
+            time.sleep(self._chunk_delay)
+            yield chunk
+
+
+class FakeModels:
+    """LLM backend whose models answer the pipeline's prompts without a network call."""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit_rate=0.0, stream_chunks=8, seed=0):
+        self.seed = seed
+        self.stream_chunks = stream_chunks
+        self.faults = _Faults(latency, jitter, rate_limit_rate, seed)
+
+    def model(self, name):
+        return _FakeModel(name, self)
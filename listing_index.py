@@ -0,0 +1,158 @@
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from cache import CACHE_PATH
+from price_parser import parse_area, parse_price
+
+logger = logging.getLogger(__name__)
+
+LISTING_MAX_AGE = 3 * 24 * 60 * 60 # Listings not seen in a web search for this long are not served
+
+
+def _to_real(value):
+    # SQLite stores infinities fine, but NULL reads better for "unknown".
+    return None if value is None else float(value)
+
+
+def _bedrooms(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r"\d+(?:\.\d+)?", str(value or ""))
+    return float(match.group()) if match else None
+
+
+def _locality_text(analysis):
+    highlights = analysis.get('locality_highlights') or ""
+    if isinstance(highlights, list):
+        highlights = " ".join(str(item) for item in highlights)
+    return str(highlights)
+
+
+@contextmanager
+def _transaction(conn):
+    # IMMEDIATE takes the write lock up front: a deferred transaction that has already read
+    # cannot upgrade once another connection to the file (e.g. the caches) has written.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class ListingIndex:
+    """Every listing seen in a search, deduplicated by href, with full-text search over its
+    text and numeric price/area/bedroom columns filled in from its Gemini analysis.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._fts = True
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                " href TEXT PRIMARY KEY, title TEXT NOT NULL, body TEXT NOT NULL, analysis TEXT,"
+                " price_min REAL, price_max REAL, area_min REAL, area_max REAL, bedrooms REAL,"
+                " seen_at REAL NOT NULL)"
+            )
+            try:
+                conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(href UNINDEXED, title, body, locality)")
+            except sqlite3.OperationalError as e:
+                logger.warning("SQLite has no FTS5 (%s); falling back to LIKE matching", e)
+                self._fts = False
+            self._conn = conn
+        return self._conn
+
+    def _index_text(self, conn, href, title, body, locality):
+        if self._fts:
+            conn.execute("DELETE FROM listings_fts WHERE href = ?", (href,))
+            conn.execute("INSERT INTO listings_fts (href, title, body, locality) VALUES (?, ?, ?, ?)", (href, title, body, locality))
+
+    def add_results(self, search_results):
+        """Inserts new listings and refreshes the text and seen time of known ones."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with _transaction(conn):
+                for result in search_results:
+                    row = conn.execute("SELECT analysis FROM listings WHERE href = ?", (result['href'],)).fetchone()
+                    conn.execute(
+                        "INSERT INTO listings (href, title, body, seen_at) VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT (href) DO UPDATE SET title = excluded.title, body = excluded.body, seen_at = excluded.seen_at",
+                        (result['href'], result['title'], result['body'], now),
+                    )
+                    locality = _locality_text(json.loads(row[0])) if row and row[0] else ""
+                    self._index_text(conn, result['href'], result['title'], result['body'], locality)
+
+    def add_analyses(self, search_results, analyses):
+        """Stores each successful analysis and the numbers parsed from it on its listing."""
+        with self._lock:
+            conn = self._connect()
+            with _transaction(conn):
+                for result, analysis in zip(search_results, analyses):
+                    if analysis.get("error"):
+                        continue
+                    price_min, price_max = parse_price(str(analysis.get('price') or ""))
+                    area = analysis.get('area_sqft')
+                    if isinstance(area, dict):
+                        area = area.get('carpet') or area.get('built_up')
+                    area_min, area_max = parse_area(str(area or ""))
+                    conn.execute(
+                        "UPDATE listings SET analysis = ?, price_min = ?, price_max = ?, area_min = ?, area_max = ?, bedrooms = ?"
+                        " WHERE href = ?",
+                        (json.dumps(analysis), _to_real(price_min), _to_real(price_max), _to_real(area_min), _to_real(area_max),
+                         _bedrooms(analysis.get('bedrooms')), result['href']),
+                    )
+                    self._index_text(conn, result['href'], result['title'], result['body'], _locality_text(analysis))
+
+    def search(self, text, price_range=(None, None), area_range=(None, None), max_age=LISTING_MAX_AGE, limit=5):
+        """Returns up to `limit` fresh listings matching every word of `text`, as search-result dicts.
+
+        Price and area ranges only exclude listings whose analyzed value falls outside them;
+        listings with no value for a column are kept.
+        """
+        clauses = ["l.seen_at >= ?"]
+        params = [time.time() - max_age]
+        words = re.findall(r"\w+", text.lower())
+        price_min, price_max = price_range
+        if price_min is not None and price_max is not None:
+            clauses.append("(l.price_min IS NULL OR (l.price_min <= ? AND l.price_max >= ?))")
+            params += [price_max if not math.isinf(price_max) else 1e300, price_min]
+        area_min, area_max = area_range
+        if area_min is not None and area_max is not None:
+            clauses.append("(l.area_min IS NULL OR (l.area_min <= ? AND l.area_max >= ?))")
+            params += [area_max if not math.isinf(area_max) else 1e300, area_min]
+
+        with self._lock:
+            conn = self._connect()
+            if words and self._fts:
+                query = ("SELECT l.title, l.href, l.body FROM listings_fts f JOIN listings l ON l.href = f.href"
+                         f" WHERE listings_fts MATCH ? AND {' AND '.join(clauses)} ORDER BY f.rank LIMIT ?")
+                params = [" ".join(f'"{word}"' for word in words)] + params
+            else:
+                for word in words:
+                    clauses.append("(l.title LIKE ? OR l.body LIKE ?)")
+                    params += [f"%{word}%", f"%{word}%"]
+                query = f"SELECT l.title, l.href, l.body FROM listings l WHERE {' AND '.join(clauses)} ORDER BY l.seen_at DESC LIMIT ?"
+            rows = conn.execute(query, params + [limit]).fetchall()
+        return [{'title': title, 'href': href, 'body': body} for title, href, body in rows]
+
+
+listing_index = ListingIndex()
@@ -0,0 +1,100 @@
+import logging
+import time
+
+import api_calls
+import backends
+import tracing
+from rate_limit import AdaptiveRateLimiter
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+GEMINI_RATE_PER_SECOND = 1
+GEMINI_BURST = 4
+STREAM_TIMEOUT = 30  # Seconds a streamed response may take before falling back to a regular request
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF = 5  # Seconds the first rate-limit error pauses Gemini calls for, doubled on each retry
+
+# One limiter for every Gemini call in the process, so a rate-limit error seen by one
+# worker slows all of them down instead of each retrying on its own schedule.
+gemini_limiter = AdaptiveRateLimiter(GEMINI_RATE_PER_SECOND, capacity=GEMINI_BURST)
+
+
+def get_model():
+    return backends.llm_backend().model(GEMINI_MODEL)
+
+
+def record_usage(span, response):
+    """Adds a Gemini response's prompt and response token counts to `span` and the metrics."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, tokens in (("prompt", usage.prompt_token_count), ("response", usage.candidates_token_count)):
+        span.add(f"{kind}_tokens", tokens or 0)
+        tracing.count("gemini_tokens_total", tokens or 0, kind=kind)
+
+
+def wait_for_limiter(span, limiter):
+    """limiter.acquire(), adding the time spent waiting to `span`."""
+    queued = time.perf_counter()
+    limiter.acquire()
+    span.add("rate_limit_wait_s", round(time.perf_counter() - queued, 4))
+
+
+def generate_text(prompt, on_chunk=None, timeout=STREAM_TIMEOUT, max_retries=RATE_LIMIT_RETRIES, initial_delay=RATE_LIMIT_BACKOFF):
+    """Returns Gemini's response to `prompt` as stripped text.
+
+    With `on_chunk`, the response is streamed and `on_chunk(text_so_far)` is called as each
+    chunk arrives. If streaming errors out or runs past `timeout`, the prompt is re-sent as a
+    regular request and its full text returned. Rate-limit errors are not re-sent at once:
+    they pause every Gemini caller through gemini_limiter, then the request is retried.
+    """
+    from google.api_core.exceptions import TooManyRequests # Loaded with google.generativeai by get_model()
+    model = get_model()
+    with tracing.span("gemini.generate", streamed=on_chunk is not None, retries=0) as span:
+        for attempt in range(max_retries):
+            try:
+                return _generate(model, prompt, on_chunk, timeout, span)
+            except TooManyRequests as e:
+                if attempt == max_retries - 1:
+                    logger.error("Failed after %d retries due to rate limit: %s", max_retries, e)
+                    raise
+                delay = initial_delay * (2 ** attempt)
+                logger.warning("Rate limit exceeded. Pausing Gemini calls for %.2f seconds...", delay)
+                span.add("retries")
+                tracing.count("gemini_retries_total")
+                gemini_limiter.on_rate_limited(delay)
+
+
+def _generate(model, prompt, on_chunk, timeout, span):
+    from google.api_core.exceptions import TooManyRequests
+    if on_chunk is not None:
+        wait_for_limiter(span, gemini_limiter)
+        api_calls.record("gemini")
+        try:
+            started = time.monotonic()
+            deadline = started + timeout
+            response = model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+            text = ""
+            for chunk in response:
+                if not text:
+                    span.set(first_chunk_s=round(time.monotonic() - started, 4))
+                text += chunk.text
+                on_chunk(text)
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"stream took longer than {timeout} seconds")
+            gemini_limiter.on_success()
+            record_usage(span, response)
+            return text.strip()
+        except TooManyRequests:
+            raise # A regular request would be throttled too; generate_text backs off instead
+        except Exception as e:
+            logger.warning("Streaming response failed, retrying without streaming: %s", e)
+            span.set(fallback=str(e))
+
+    wait_for_limiter(span, gemini_limiter)
+    api_calls.record("gemini")
+    response = model.generate_content(prompt)
+    gemini_limiter.on_success()
+    record_usage(span, response)
+    return response.text.strip()
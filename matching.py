@@ -0,0 +1,241 @@
+import logging
+import math
+import re
+from functools import lru_cache
+
+import numpy as np
+
+import semantic
+from price_parser import area_ranges, parse_area, parse_price, price_ranges
+
+logger = logging.getLogger(__name__)
+
+# Points per comparison outcome; matches the weights calculate_score used to apply to the text.
+LOCATION_WEIGHT = 5
+BUDGET_WEIGHT = 4
+AREA_WEIGHT = 3
+AMENITIES_WEIGHT = 2
+FLOOR_WEIGHT = 1
+AREA_TOLERANCE = 0.1 # Allowing a 10% difference
+
+
+def _area_text(area_data):
+    if isinstance(area_data, dict):
+        if 'carpet' in area_data and area_data['carpet']:
+            return str(area_data['carpet'])
+        elif 'built_up' in area_data and area_data['built_up']:
+            return str(area_data['built_up'])
+    elif isinstance(area_data, (int, float, str)):
+        return str(area_data)
+    return ''
+
+
+def _stated_range_met(ranges, overlaps):
+    """For estimates: stated ranges meet a preference unless they all agree on one that doesn't."""
+    if len(set(ranges)) != 1:
+        return True # Nothing stated, or several figures (a booking amount and a price, two unit sizes)
+    return overlaps(*ranges[0])
+
+
+def _pattern(text):
+    return re.compile(re.escape(text), re.IGNORECASE) if text else None
+
+
+class PreferenceMatcher:
+    """User preferences compiled once into numbers, sets and regexes, then scored against
+    whole batches of analyzed listings at a time.
+    """
+
+    def __init__(self, user_preferences):
+        self.location = user_preferences.get('location', '').strip()
+        self.location_pattern = re.compile(re.escape(self.location), re.IGNORECASE)
+        self.budget_min, self.budget_max = parse_price(user_preferences.get('budget', ''))
+        area_min, area_max = parse_area(user_preferences.get('carpet_area', ''))
+        self.area = None if area_min is None or math.isinf(area_max) else (area_min + area_max) / 2
+        self.floor = user_preferences.get('floor_preference', '').lower()
+        self.floor_pattern = _pattern(self.floor)
+        self.financing = user_preferences.get('financing', '').lower()
+        self.financing_pattern = _pattern(self.financing)
+        amenities_str = user_preferences.get('preferred_amenities', '').lower()
+        self.amenities = [amenity.strip() for amenity in amenities_str.split(',') if amenity.strip()]
+
+    def _location_matches(self, analyses, texts):
+        """Booleans: does each listing name the preferred location, literally or as one of
+        its known spellings ("Chembur (E)", "Andheri W").
+        """
+        searchable = []
+        for analysis, text in zip(analyses, texts):
+            highlights = analysis.get('locality_highlights')
+            if isinstance(highlights, list):
+                highlights = "\n".join(str(item) for item in highlights)
+            searchable.append(f"{highlights}\n{text}" if isinstance(highlights, str) else text)
+        literal = np.fromiter((bool(self.location_pattern.search(text)) for text in searchable), dtype=bool, count=len(searchable))
+        if not self.location or literal.all():
+            return literal
+        return literal | semantic.mentions_locality(self.location, searchable)
+
+    def _amenity_matrix(self, analyses):
+        """(listings x preferred amenities) booleans: does listing i offer something like amenity j."""
+        return semantic.amenity_matches(self.amenities, [[str(amenity) for amenity in analysis.get('amenities') or []] for analysis in analyses])
+
+    @property
+    def max_score(self):
+        """The best score any listing can get with these preferences."""
+        return (LOCATION_WEIGHT + BUDGET_WEIGHT * (self.budget_min is not None and self.budget_max is not None)
+                + AREA_WEIGHT * bool(self.area) + AMENITIES_WEIGHT * bool(self.amenities) + FLOOR_WEIGHT * bool(self.floor_pattern))
+
+    def estimate(self, search_results):
+        """Optimistic scores for listings that have not been analyzed, from their title and body.
+
+        Meant as an upper bound on compare()'s score, so a criterion only counts as unmet
+        when the text settles it:
+        - location, when the text names another known locality and not the preferred one
+          (compare() also reads the analysis's locality highlights, which come from this text);
+        - budget and area, when every price or area written with a unit agrees on one value
+          that misses the preference. Bare numbers ("Sector 17", "12 floors") settle nothing,
+          and neither do several different figures (a booking amount and a price, two unit sizes).
+        """
+        texts = [f"{result['title']}\n{result['body']}" for result in search_results]
+        n = len(texts)
+        location_match = self._location_matches([{}] * n, texts) | ~semantic.names_other_locality(self.location, texts)
+        floor_match = np.fromiter((bool(self.floor_pattern and self.floor_pattern.search(t)) for t in texts), dtype=bool, count=n)
+
+        if self.budget_min is not None and self.budget_max is not None:
+            within_budget = np.fromiter((_stated_range_met(price_ranges(text), lambda low, high: self.budget_min <= high and self.budget_max >= low)
+                                         for text in texts), dtype=bool, count=n)
+        else:
+            within_budget = np.zeros(n, dtype=bool)
+
+        if self.area:
+            area_close = np.fromiter((_stated_range_met(area_ranges(text), lambda low, high: low < self.area * (1 + AREA_TOLERANCE) and high > self.area * (1 - AREA_TOLERANCE))
+                                      for text in texts), dtype=bool, count=n)
+        else:
+            area_close = np.zeros(n, dtype=bool)
+
+        any_amenity = semantic.mentions_amenities(self.amenities, texts).any(axis=1)
+
+        return (LOCATION_WEIGHT * location_match + BUDGET_WEIGHT * within_budget + AREA_WEIGHT * area_close
+                + AMENITIES_WEIGHT * any_amenity + FLOOR_WEIGHT * floor_match)
+
+    def compare(self, analyzed_properties, search_results):
+        """Returns the comparison dicts compare_properties produces, each with its 'score'."""
+        indices = []
+        for i, analysis in enumerate(analyzed_properties):
+            if "error" in analysis:
+                logger.warning("Property %d Analysis failed: %s", i + 1, analysis['error'])
+            else:
+                indices.append(i)
+        analyses = [analyzed_properties[i] for i in indices]
+        results = [search_results[i] for i in indices]
+        texts = [f"{result['title']}\n{result['body']}" for result in results]
+        n = len(analyses)
+
+        # Location, floor and financing
+        location_match = self._location_matches(analyses, texts)
+        floor_match = np.fromiter((bool(self.floor_pattern and self.floor_pattern.search(t)) for t in texts), dtype=bool, count=n)
+        financing_match = np.fromiter((bool(self.financing_pattern and self.financing_pattern.search(t)) for t in texts), dtype=bool, count=n)
+
+        # Budget: the listing's price range has to overlap the preferred one
+        has_price = np.fromiter((bool(a.get('price')) for a in analyses), dtype=bool, count=n)
+        prices = np.array([parse_price(str(a['price'])) if a.get('price') else (None, None) for a in analyses], dtype=float).reshape(n, 2)
+        price_known = ~np.isnan(prices).any(axis=1)
+        if self.budget_min is not None and self.budget_max is not None:
+            budget_comparable = has_price & price_known
+            within_budget = budget_comparable & (self.budget_min <= prices[:, 1]) & (self.budget_max >= prices[:, 0])
+        else:
+            budget_comparable = np.zeros(n, dtype=bool)
+            within_budget = budget_comparable
+
+        # Area: a listing's (possibly ranged) area is close if any of it is within tolerance
+        area_texts = [_area_text(a.get('area_sqft')) for a in analyses]
+        has_area_text = np.array([bool(text) for text in area_texts], dtype=bool)
+        areas = np.array([parse_area(text) if text else (None, None) for text in area_texts], dtype=float).reshape(n, 2)
+        if self.area:
+            with np.errstate(invalid='ignore'):
+                area_close = (areas[:, 0] < self.area * (1 + AREA_TOLERANCE)) & (areas[:, 1] > self.area * (1 - AREA_TOLERANCE))
+                area_larger = ~area_close & (areas[:, 0] > self.area)
+                area_smaller = ~area_close & (areas[:, 1] < self.area)
+        else:
+            area_close = area_larger = area_smaller = np.zeros(n, dtype=bool)
+        area_unknown = np.isnan(areas).any(axis=1)
+
+        amenities_found = self._amenity_matrix(analyses)
+        any_amenity = amenities_found.any(axis=1)
+
+        scores = (LOCATION_WEIGHT * location_match + BUDGET_WEIGHT * within_budget + AREA_WEIGHT * area_close
+                  + AMENITIES_WEIGHT * any_amenity + FLOOR_WEIGHT * floor_match)
+
+        compared_properties = []
+        for row, (i, analysis, result) in enumerate(zip(indices, analyses, results)):
+            points = []
+            if location_match[row]:
+                points.append("Location: Matches preferred location.")
+            else:
+                points.append("Location: Might not match preferred location.")
+
+            if not has_price[row]:
+                points.append("Budget: No price information found.")
+            elif not budget_comparable[row]:
+                points.append("Budget: Price information unclear for comparison.")
+            elif within_budget[row]:
+                points.append("Budget: Potentially within budget.")
+            else:
+                points.append("Budget: Potentially outside budget.")
+
+            if self.area:
+                if area_close[row]:
+                    points.append(f"Area: Close to preferred area ({self.area} sq ft).")
+                elif area_larger[row]:
+                    points.append(f"Area: Larger than preferred area ({self.area} sq ft).")
+                elif area_smaller[row]:
+                    points.append(f"Area: Smaller than preferred area ({self.area} sq ft).")
+                elif area_unknown[row] and has_area_text[row]:
+                    points.append("Area: Could not determine area for comparison.")
+                elif not has_area_text[row]:
+                    points.append("Area: No area information found.")
+
+            if floor_match[row]:
+                points.append(f"Floor Preference: Mentions preferred floor ({self.floor}).")
+            elif self.floor:
+                points.append(f"Floor Preference: Does not mention preferred floor ({self.floor}).")
+
+            found = [amenity for amenity, hit in zip(self.amenities, amenities_found[row]) if hit]
+            missing = [amenity for amenity, hit in zip(self.amenities, amenities_found[row]) if not hit]
+            if found:
+                points.append(f"Amenities: Includes preferred amenities: {', '.join(found)}.")
+            if missing:
+                points.append(f"Amenities: Missing some preferred amenities: {', '.join(missing)}.")
+            elif not self.amenities:
+                points.append("Amenities: No preferred amenities specified.")
+
+            if financing_match[row]:
+                points.append(f"Financing: Mentions related financing options ({self.financing}).")
+            elif self.financing:
+                points.append(f"Financing: Does not mention related financing options ({self.financing}).")
+
+            if analysis.get('builder_reputation_highlights'):
+                points.append("Builder Reputation: Highlights mentioned in listing.")
+
+            compared_properties.append({
+                'property_index': i + 1,
+                'url': result['href'],
+                'title': result['title'],
+                'analysis': analysis,
+                'comparison_points': points,
+                'score': int(scores[row]),
+            })
+        return compared_properties
+
+
+@lru_cache(maxsize=128)
+def _compiled_matcher(preference_items):
+    return PreferenceMatcher(dict(preference_items))
+
+
+def get_matcher(user_preferences):
+    """Returns the compiled matcher for these preferences, reusing one compiled earlier."""
+    return _compiled_matcher(tuple(sorted(user_preferences.items())))
+
+
+def compare_properties(analyzed_properties, user_preferences, search_results):
+    return get_matcher(user_preferences).compare(analyzed_properties, search_results)
@@ -0,0 +1,337 @@
+"""The property recommendation pipeline, free of any Streamlit code.
+
+app.py drives these functions from its UI, and batch.py runs them headless over many
+preference profiles. They may run on worker threads, so they return data (with an "error"
+key where something failed) rather than rendering anything.
+"""
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import tracing
+from dedup import extend
+from entity_summaries import canonical_builder, canonical_locality, summary_store
+from listing_index import listing_index
+from llm import generate_text
+from matching import AREA_TOLERANCE, compare_properties, get_matcher
+from price_parser import parse_area, parse_price
+from property_analysis import analyze_properties
+from search_executor import get_search_executor
+from task_graph import TaskGraph
+
+# Progressive search: how many listings to fetch at a time, and when to stop.
+PAGE_SIZE = 5
+MAX_PAGES = 4
+MAX_ANALYZED = 12 # Listings sent for analysis, cached or not
+TIME_BUDGET_S = 45.0
+
+
+def build_search_query(preferences):
+    location = preferences.get('location', 'Mumbai')
+    budget = preferences.get('budget', '')
+    carpet_area = preferences.get('carpet_area', '')
+    floor_preference = preferences.get('floor_preference', '')
+    financing = preferences.get('financing', '')
+
+    search_query_parts = [f"property for sale in {location}"]
+    if budget:
+        search_query_parts.append(f"budget {budget}")
+    if carpet_area:
+        search_query_parts.append(f"carpet area around {carpet_area} sq ft")
+    if floor_preference:
+        search_query_parts.append(f"floor preference {floor_preference}")
+
+    return " ".join(search_query_parts)
+
+def analyze_and_index(listings):
+    """Analyzes deduplicated listings; each analysis is also indexed for the listing's duplicates."""
+    analyses = analyze_properties(listings)
+    indexed = [(result, analysis) for listing, analysis in zip(listings, analyses) for result in [listing] + listing.get('duplicates', [])]
+    listing_index.add_analyses([result for result, _ in indexed], [analysis for _, analysis in indexed])
+    return analyses
+
+def listing_pages(preferences, page_size=PAGE_SIZE):
+    """Yields candidate listings a page at a time: fresh matches from the local listing
+    index first, then web results, each web page fetched only when the next one is asked for.
+    """
+    area_min, area_max = parse_area(preferences.get('carpet_area', ''))
+    if area_min is not None:
+        area_min, area_max = area_min * (1 - AREA_TOLERANCE), area_max * (1 + AREA_TOLERANCE)
+    indexed = listing_index.search(
+        preferences.get('location', 'Mumbai'),
+        price_range=parse_price(preferences.get('budget', '')),
+        area_range=(area_min, area_max),
+        limit=page_size,
+    )
+    if indexed:
+        yield indexed
+    for web_results in get_search_executor().search_pages(build_search_query(preferences), page_size, family="listings"):
+        listing_index.add_results(web_results)
+        yield web_results
+
+def find_properties(user_preferences, top_k=3, page_size=PAGE_SIZE, max_pages=MAX_PAGES, max_analyzed=MAX_ANALYZED, time_budget=TIME_BUDGET_S):
+    """Searches and analyzes progressively, keeping only the best top_k listings.
+
+    Listings are fetched a page at a time and deduplicated as they arrive. Each one gets an
+    optimistic estimate from its title and body (PreferenceMatcher.estimate), and the
+    listings whose estimate beats the current k-th best score are analyzed, best estimate
+    first, top_k at a time. The search stops when the k-th best score can no longer be
+    beaten, when a whole page has nothing that could beat it, or when the page, analysis
+    or time budget runs out. The next page is only fetched after one with a listing that
+    could beat the k-th best, and it loads while that page's listings are analyzed.
+
+    Returns a dict with every deduplicated listing seen ('search_results'), the listings
+    analyzed with their analyses ('listings', 'analyses'), the top_k ranked property
+    dicts rank_properties would return ('ranked_properties'), and 'out_of_budget': "time"
+    or "analysis" if a budget ran out while listings that could still make the top k were
+    left unanalyzed, else None.
+    """
+    with tracing.span("find_properties", top_k=top_k) as span:
+        deadline = time.monotonic() + time_budget
+        matcher = get_matcher(user_preferences)
+        pages = listing_pages(user_preferences, page_size)
+        page_fetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pages")
+        next_page = page_fetcher.submit(tracing.propagate(next), pages, None)
+        candidates = [] # Deduplicated listings, in the order they were found
+        estimates = []
+        analyzed = [] # Positions in candidates, in the order they were analyzed
+        analyses = []
+        top = [] # Min-heap of (score, -position in analyzed, property dict), at most top_k long
+        pages_fetched = 0
+
+        def kth_best():
+            return top[0][0] if len(top) == top_k else -1
+
+        out_of_budget = None
+        try:
+            while True:
+                if time.monotonic() >= deadline:
+                    out_of_budget = "time"
+                    break
+                done = set(analyzed)
+                beatable = sorted((i for i in range(len(candidates)) if i not in done and estimates[i] > kth_best()),
+                                  key=lambda i: (-estimates[i], i))
+                pending = beatable[:min(top_k, max_analyzed - len(analyzed))]
+                if pending:
+                    listings = [candidates[i] for i in pending]
+                    round_analyses = analyze_and_index(listings)
+                    round_positions = {id(listing): len(analyzed) + j for j, listing in enumerate(listings)}
+                    for prop in rank_properties(listings, round_analyses, user_preferences):
+                        position = round_positions[id(prop['search_result'])]
+                        prop['property_index'] = position + 1
+                        entry = (prop['score'], -position, prop)
+                        if len(top) < top_k:
+                            heapq.heappush(top, entry)
+                        elif entry[:2] > top[0][:2]:
+                            heapq.heapreplace(top, entry)
+                    analyzed += pending
+                    analyses += round_analyses
+                    continue
+
+                if len(analyzed) >= max_analyzed:
+                    if beatable:
+                        out_of_budget = "analysis"
+                    break
+                if next_page is None or kth_best() >= matcher.max_score:
+                    break
+                try:
+                    page = next_page.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    out_of_budget = "time"
+                    break
+                next_page = None
+                if page is None:
+                    break
+                pages_fetched += 1
+                new_listings = extend(candidates, page)
+                new_estimates = matcher.estimate(new_listings).tolist()
+                candidates += new_listings
+                estimates += new_estimates
+                if new_estimates and not any(estimate > kth_best() for estimate in new_estimates):
+                    break # Results further down the search are less relevant still
+                if pages_fetched < max_pages:
+                    # This page could still change the top k, so the next one is probably worth
+                    # fetching; it loads while this page's listings are analyzed.
+                    next_page = page_fetcher.submit(tracing.propagate(next), pages, None)
+        finally:
+            page_fetcher.shutdown(wait=False, cancel_futures=True)
+
+        span.set(pages=pages_fetched, listings=len(candidates), analyzed=len(analyzed), out_of_budget=out_of_budget)
+        return {
+            'search_results': candidates,
+            'listings': [candidates[i] for i in analyzed],
+            'analyses': analyses,
+            'ranked_properties': [prop for _, _, prop in sorted(top, key=lambda entry: entry[:2], reverse=True)],
+            'out_of_budget': out_of_budget,
+        }
+
+def get_locality_information(location, on_chunk=None):
+    with tracing.span("locality", location=location):
+        return _locality_information(location, on_chunk)
+
+def _locality_information(location, on_chunk):
+    locality_key, location = canonical_locality(location)
+    locality = {'name': location, 'summary': ""}
+    locality_info = {}
+    all_snippets = []
+
+    queries = [
+        f"{location} schools",
+        f"{location} hospitals",
+        f"{location} malls",
+        f"{location} distance from railway station",
+        f"{location} distance from metro station",
+        f"{location} distance from airport",
+        f"{location} places to visit",
+        f"{location} crime rate safety",
+        f"{location} problems"
+    ]
+
+    # Limiting to 1 result per query for brevity in Streamlit
+    for query, results in zip(queries, get_search_executor().search_many(queries, max_results=1, family="locality")):
+        locality_info[query] = results
+        all_snippets.extend(result['body'] for result in results)
+
+    locality['sources'] = locality_info
+    if all_snippets:
+        def summarize():
+            prompt = f"""You are a helpful AI assistant summarizing information about the locality of {location} for a potential home buyer. Based on the following information found on the internet, provide a concise summary covering aspects like nearby schools, hospitals, malls, distance from railway station, metro station, airport, places to visit, crime rate, safety parameters, and any potential problems.
+
+Information:
+{' '.join(all_snippets)}
+
+Locality Summary for Buyer:
+"""
+            return generate_text(prompt, on_chunk)
+
+        try:
+            locality['summary'] = summary_store.get_or_create("locality", locality_key, all_snippets, summarize)
+        except Exception as e:
+            locality['error'] = f"Error summarizing locality information: {e}"
+
+    return locality
+
+def get_builder_information(builder_name, on_chunk=None):
+    with tracing.span("builder", builder=builder_name):
+        return _builder_information(builder_name, on_chunk)
+
+def _builder_information(builder_name, on_chunk):
+    if builder_name and not isinstance(builder_name, str):
+        builder_name = str(builder_name) # Comes straight from Gemini's JSON, which may hold a list or a number
+    builder = {'name': builder_name, 'summary': ""}
+    if builder_name:
+        builder_key, builder_name = canonical_builder(builder_name)
+        builder['name'] = builder_name
+        builder_info = {}
+        all_snippets = []
+        queries = [
+            f"{builder_name} reputation",
+            f"{builder_name} past projects",
+            f"{builder_name} reviews"
+        ]
+        for query, results in zip(queries, get_search_executor().search_many(queries, max_results=1, family="builder")): # Limiting to 1 for brevity
+            builder_info[query] = results
+            all_snippets.extend(result['body'] for result in results)
+        builder['sources'] = builder_info
+
+        if all_snippets:
+            def summarize():
+                prompt = f"""You are a helpful AI assistant summarizing information about a property builder named {builder_name}. Based on the following information found on the internet, provide a concise summary of potential pros and cons for a buyer.
+
+Information:
+{' '.join(all_snippets)}
+
+Summary of potential pros:
+-
+
+Summary of potential cons:
+-
+"""
+                return generate_text(prompt, on_chunk)
+
+            try:
+                builder['summary'] = summary_store.get_or_create("builder", builder_key, all_snippets, summarize)
+            except Exception as e:
+                builder['error'] = f"Error summarizing builder information: {e}"
+
+    return builder
+
+def pair_analyses(search_results, analyses):
+    """Drops failed analyses, returning (analyzed_properties, analyzed_results) in matching order."""
+    analyzed_properties = []
+    analyzed_results = [] # The search result each entry of analyzed_properties came from
+    for result, analysis in zip(search_results, analyses):
+        if not analysis.get("error"):
+            analyzed_properties.append(analysis)
+            analyzed_results.append(result)
+    return analyzed_properties, analyzed_results
+
+def rank_properties(search_results, analyses, user_preferences):
+    with tracing.span("compare") as span:
+        analyzed_properties, analyzed_results = pair_analyses(search_results, analyses)
+        span.set(listings=len(analyzed_properties))
+        ranked_properties = []
+        if analyzed_properties:
+            compared_properties = compare_properties(analyzed_properties, user_preferences, analyzed_results)
+            for prop in compared_properties:
+                prop['search_result'] = analyzed_results[prop['property_index'] - 1] # Store original search result for link
+                ranked_properties.append(prop)
+            ranked_properties.sort(key=lambda x: x['score'], reverse=True)
+        return ranked_properties
+
+def generate_property_summary(user_preferences, comparison_points, on_chunk=None):
+    summary_prompt = f"""Based on your preferences:
+Location: {user_preferences.get('location')}
+Budget: {user_preferences.get('budget')}
+Carpet Area: {user_preferences.get('carpet_area')} sq ft
+Floor Preference: {user_preferences.get('floor_preference')}
+Preferred Amenities: {user_preferences.get('preferred_amenities')}
+Financing Options: {user_preferences.get('financing')}
+
+And the following comparison points for this property:
+{' '.join(comparison_points)}
+
+Provide a short, concise summary of how well this property aligns with the user's overall preferences, highlighting potential pros and cons.
+"""
+    with tracing.span("property_summary"):
+        try:
+            property_summary = generate_text(summary_prompt, on_chunk)
+            return property_summary
+        except Exception as e:
+            return f"Error generating property summary: {e}"
+
+def run_recommendation(user_preferences, top_k=3, writer=None, on_wait=None):
+    """Runs one app submission as a TaskGraph, yielding (task name, future) as each task
+    finishes, in whatever order that is.
+
+    "locality" and "search" (find_properties) start together. After "search" has been
+    yielded, "builder:i" and "summary:i" are added for each of its ranked properties. With
+    `writer`, writer(task name) gives the on_chunk callback for that task's streamed text;
+    `on_wait` is passed to TaskGraph.as_completed().
+    """
+    def on_chunk(name):
+        return writer(name) if writer is not None else None
+
+    with TaskGraph() as graph:
+        graph.add("locality", lambda: get_locality_information(user_preferences.get('location') or 'Mumbai', on_chunk("locality")))
+        graph.add("search", lambda: find_properties(user_preferences, top_k=top_k))
+        for name, future in graph.as_completed(on_wait=on_wait):
+            yield name, future
+            if name == "search" and future.exception() is None:
+                # Each recommendation's builder lookup and summary are independent of the others.
+                for i, prop in enumerate(future.result()['ranked_properties']):
+                    builder_name = prop['analysis'].get('builder', 'Not mentioned')
+                    graph.add(f"builder:{i}", lambda builder_name=builder_name, chunk=on_chunk(f"builder:{i}"): get_builder_information(builder_name, chunk))
+                    graph.add(f"summary:{i}", lambda points=prop['comparison_points'], chunk=on_chunk(f"summary:{i}"): generate_property_summary(user_preferences, points, chunk))
+
+def recommend(user_preferences, top_n=3, with_summaries=False):
+    """Runs the progressive search (see find_properties) for one set of preferences.
+
+    Returns the top_n ranked property dicts; with_summaries adds each one's Gemini 'summary'.
+    """
+    ranked_properties = find_properties(user_preferences, top_k=top_n)['ranked_properties']
+    if with_summaries:
+        for prop in ranked_properties:
+            prop['summary'] = generate_property_summary(user_preferences, prop['comparison_points'])
+    return ranked_properties
@@ -0,0 +1,183 @@
+"""Reads Indian listing prices and areas such as "₹1.2 Cr onwards", "85 Lakh - 1.1 Cr" or
+"1,200 sq.ft." into numbers.
+
+Text is tokenized in a single regex pass, the tokens are grouped into phrases (a value or a
+range, its unit, and any "onwards"/"upto" style modifiers), and the first phrase of the right
+kind wins. Results are memoized, since the same strings recur across listings and reruns.
+"""
+import math
+import re
+from functools import lru_cache
+
+CRORE = 10000000
+LAKH = 100000
+SQFT_PER_SQM = 10.7639
+SQFT_PER_SQYD = 9.0
+
+_TOKEN = re.compile(r"""
+    (?P<number>\d[\d,]*(?:\.\d+)?|\.\d+)
+  | (?P<area_unit>sq(?:uare)?\.?\s*(?:ft|feet|foot)\b\.?|sqft|sft
+      |sq(?:uare)?\.?\s*(?:yds?|yards?)\b\.?|sqyds?|gaj
+      |sq(?:uare)?\.?\s*(?:m|mt|mtrs?|meters?|metres?)\b\.?|sqm)
+  | (?P<price_unit>(?<![a-z])(?:crores?|crs?|lakhs?|lacs?|l|k|thousand|million|mn)\b)
+  | (?P<above_suffix>onwards|and\s+above|&\s*above|\+)
+  | (?P<above_prefix>\b(?:above|starting|starts|from|over|min(?:imum)?|more\s+than)\b)
+  | (?P<below_prefix>\b(?:under|up\s*to|upto|below|max(?:imum)?|within|less\s+than)\b)
+  | (?P<range>[-–—](?![a-z])|\bto\b)
+  | (?P<between>\bbetween\b)
+  | (?P<conjunction>\band\b)
+  | (?P<currency>₹|\brs\b\.?|\binr\b)
+  | (?P<bedrooms>(?<![a-z])(?:bhk|rk|bed|beds|bedrooms?)\b)
+  | (?P<per>\bper\b)
+  | (?P<word>[a-z]+)
+""", re.VERBOSE)
+
+
+def _tokenize(text):
+    return [(match.lastgroup, match.group(match.lastgroup)) for match in _TOKEN.finditer(text.lower())]
+
+
+def _price_multiplier(unit):
+    if unit.startswith("c"):
+        return CRORE
+    if unit.startswith("la") or unit == "l":
+        return LAKH
+    if unit.startswith("m"):
+        return 1000000
+    return 1000
+
+
+def _area_multiplier(unit):
+    if "y" in unit or unit == "gaj":
+        return SQFT_PER_SQYD
+    if "f" in unit:
+        return 1.0
+    return SQFT_PER_SQM
+
+
+def _phrases(tokens):
+    """Groups tokens into phrases: {'values', 'units', 'kind', 'above', 'below', 'bedrooms'}."""
+    phrases = []
+    prefix = set()
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind != "number":
+            if kind in ("currency", "above_prefix", "below_prefix", "between"):
+                prefix.add(kind)
+            i += 1
+            continue
+
+        phrase = {"values": [], "units": [], "above": "above_prefix" in prefix,
+                  "below": "below_prefix" in prefix, "currency": "currency" in prefix, "bedrooms": False}
+        # "and" only separates a range after "between", e.g. "between 1 and 1.5 Cr".
+        separators = ("range", "conjunction") if "between" in prefix else ("range",)
+        prefix = set()
+        while True:
+            phrase["values"].append(float(tokens[i][1].replace(",", "") or 0))
+            i += 1
+            unit = None
+            if i + 1 < len(tokens) and tokens[i][0] == "per" and tokens[i + 1][0] == "area_unit":
+                i += 1 # "25,500 per sq.ft." is a rate, read like an area so it is never taken as a price
+            if i < len(tokens) and tokens[i][0] in ("price_unit", "area_unit"):
+                unit = tokens[i]
+                i += 1
+            phrase["units"].append(unit)
+            # A second value right after a range separator, possibly with its own currency sign.
+            # Words keep their own tokens, so "1.2 Cr, walking distance to 2 schools" is not a
+            # range; nor is "1.5 Cr - 3 BHK", whose second value is a bedroom count.
+            j = i + 1
+            if j < len(tokens) and tokens[j][0] == "currency":
+                j += 1
+            if len(phrase["values"]) == 1 and i < len(tokens) and tokens[i][0] in separators \
+                    and j < len(tokens) and tokens[j][0] == "number" \
+                    and not (j + 1 < len(tokens) and tokens[j + 1][0] == "bedrooms"):
+                i = j
+                continue
+            break
+
+        while i < len(tokens) and tokens[i][0] in ("above_suffix", "bedrooms"):
+            phrase["above" if tokens[i][0] == "above_suffix" else "bedrooms"] = True
+            i += 1
+
+        # "1.1-1.4 Cr": a unit written once applies to both ends of the range.
+        if len(phrase["units"]) == 2 and phrase["units"][0] is None:
+            phrase["units"][0] = phrase["units"][1]
+        unit_kinds = {unit[0] for unit in phrase["units"] if unit}
+        if "area_unit" in unit_kinds:
+            phrase["kind"] = "area"
+        elif "price_unit" in unit_kinds or phrase["currency"]:
+            phrase["kind"] = "price"
+        else:
+            phrase["kind"] = "bare"
+        phrases.append(phrase)
+    return phrases
+
+
+def _bounds(phrase, multiplier):
+    values = [value * (multiplier(unit[1]) if unit else 1.0) for value, unit in zip(phrase["values"], phrase["units"])]
+    low, high = min(values), max(values)
+    if len(values) == 1:
+        if phrase["above"]:
+            high = math.inf
+        elif phrase["below"]:
+            low = 0.0
+    return low, high
+
+
+def _first_phrase(phrases, preferred_kind, allow_bare):
+    candidates = [phrase for phrase in phrases if not phrase["bedrooms"]]
+    for kind in (preferred_kind, "bare") if allow_bare else (preferred_kind,):
+        for phrase in candidates:
+            if phrase["kind"] == kind:
+                return phrase
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_price(text, allow_bare=True):
+    """Returns a (min, max) price in rupees, or (None, None) if none can be read.
+
+    Open-ended prices ("1.2 Cr onwards", "under 90 L") use math.inf or 0 for the open end.
+    Numbers without a unit are taken as rupees, unless allow_bare is False; free text such
+    as a listing's body should only trust a price with a unit or a rupee sign.
+    """
+    phrase = _first_phrase(_phrases(_tokenize(text)), "price", allow_bare)
+    if phrase is None:
+        return None, None
+    return _bounds(phrase, _price_multiplier)
+
+
+@lru_cache(maxsize=4096)
+def parse_area(text, allow_bare=True):
+    """Returns a (min, max) area in square feet, or (None, None) if none can be read.
+
+    Square metres and square yards are converted; numbers without a unit are taken as sq ft,
+    unless allow_bare is False.
+    """
+    phrase = _first_phrase(_phrases(_tokenize(text)), "area", allow_bare)
+    if phrase is None:
+        return None, None
+    return _bounds(phrase, _area_multiplier)
+
+
+def _stated_ranges(text, kind, multiplier):
+    return tuple(_bounds(phrase, multiplier) for phrase in _phrases(_tokenize(text))
+                 if phrase["kind"] == kind and not phrase["bedrooms"])
+
+
+@lru_cache(maxsize=4096)
+def price_ranges(text):
+    """Every price in `text` written with a unit or a rupee sign, as (min, max) rupees."""
+    return _stated_ranges(text, "price", _price_multiplier)
+
+
+@lru_cache(maxsize=4096)
+def area_ranges(text):
+    """Every area in `text` written with a unit, as (min, max) square feet."""
+    return _stated_ranges(text, "area", _area_multiplier)
+
+
+def cache_info():
+    return {"parse_price": parse_price.cache_info(), "parse_area": parse_area.cache_info(),
+            "price_ranges": price_ranges.cache_info(), "area_ranges": area_ranges.cache_info()}
@@ -0,0 +1,259 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import api_calls
+import tracing
+from cache import PersistentCache, make_key
+from llm import GEMINI_MODEL, gemini_limiter, get_model, record_usage, wait_for_limiter
+
+logger = logging.getLogger(__name__)
+
+MAX_ANALYSIS_WORKERS = 4
+
+# Batch sizing. Output is the binding limit (a listing's JSON is ~250 tokens against an
+# 8k output cap), input is kept modest so one slow batch does not hold up the rest.
+MAX_BATCH_SIZE = 20
+BATCH_INPUT_TOKEN_BUDGET = 12000
+BATCH_OUTPUT_TOKEN_BUDGET = 6000
+OUTPUT_TOKENS_PER_LISTING = 250
+CHARS_PER_TOKEN = 4
+
+ANALYSIS_CACHE_TTL = 30 * 24 * 60 * 60
+ANALYSIS_CACHE_MAX_ENTRIES = 10000
+
+# Keyed on the model name and the full prompt, so the same listing text is only ever
+# analyzed once and editing the prompt template invalidates old entries.
+analysis_cache = PersistentCache("gemini_analysis", ANALYSIS_CACHE_TTL, ANALYSIS_CACHE_MAX_ENTRIES)
+
+
+ANALYSIS_FIELDS = (
+    "price", "area_sqft", "bedrooms", "bathrooms", "amenities",
+    "builder", "builder_reputation_highlights", "locality_highlights",
+)
+
+ANALYSIS_SCHEMA = """{
+  "price": "approximate price if mentioned",
+  "area_sqft": "carpet or built-up area in square feet if mentioned",
+  "bedrooms": "number of bedrooms if mentioned",
+  "bathrooms": "number of bathrooms if mentioned",
+  "amenities": ["list of key amenities mentioned"],
+  "builder": "name of the builder/constructor if mentioned",
+  "builder_reputation_highlights": "any highlights about the builder's reputation or past projects mentioned in the listing",
+  "locality_highlights": "key highlights or features of the locality mentioned"
+}"""
+
+
+class AnalysisFailed(Exception):
+    pass
+
+
+def _analysis_prompt(search_result):
+    return f"""You are an AI Property Assistant. Analyze the following property listing and extract the information as a JSON object. Do not include any other text or explanations in your response.
+
+{ANALYSIS_SCHEMA}
+
+Title: {search_result['title']}
+Description: {search_result['body']}
+
+If a piece of information is not available, set its value to null or an empty list/string. Ensure the output is a valid JSON object.
+"""
+
+
+def _batch_analysis_prompt(search_results):
+    listings = "\n\n".join(
+        f"Listing {i}\nTitle: {result['title']}\nDescription: {result['body']}"
+        for i, result in enumerate(search_results, start=1)
+    )
+    return f"""You are an AI Property Assistant. Analyze each of the following {len(search_results)} property listings and extract the information for each one as a JSON object of this form:
+
+{ANALYSIS_SCHEMA}
+
+Return a JSON array with exactly one object per listing, and add a "listing_index" field to each object holding the number of the listing it describes. Do not include any other text or explanations in your response.
+
+{listings}
+
+If a piece of information is not available, set its value to null or an empty list/string. Ensure the output is a valid JSON array.
+"""
+
+
+def _cache_key(search_result):
+    # Batched and single analyses share entries, so both key on the single-listing prompt.
+    return make_key(GEMINI_MODEL, _analysis_prompt(search_result))
+
+
+def _generate_unfenced(prompt, limiter, max_retries, initial_delay):
+    """Returns Gemini's response with any Markdown code fence removed.
+
+    Rate-limit errors are retried with a global backoff; other failures raise AnalysisFailed.
+    """
+    from google.api_core.exceptions import TooManyRequests # Loaded with google.generativeai by get_model()
+    model = get_model()
+    with tracing.span("gemini.generate", retries=0) as span:
+        for attempt in range(max_retries):
+            wait_for_limiter(span, limiter) # Includes any backoff pause set by a rate-limit error
+            api_calls.record("gemini")
+            try:
+                response = model.generate_content(prompt)
+                limiter.on_success()
+                record_usage(span, response)
+                raw_response = response.text.strip()
+                if raw_response.startswith("```json"):
+                    raw_response = raw_response[len("```json"):].strip()
+                elif raw_response.startswith("```"):
+                    raw_response = raw_response[len("```"):].strip()
+                if raw_response.endswith("```"):
+                    raw_response = raw_response[:-len("```")].strip()
+                return raw_response
+            except TooManyRequests as e:
+                if attempt < max_retries - 1:
+                    delay = initial_delay * (2 ** attempt)
+                    logger.warning("Rate limit exceeded. Pausing Gemini calls for %.2f seconds...", delay)
+                    span.add("retries")
+                    tracing.count("gemini_retries_total")
+                    limiter.on_rate_limited(delay)
+                else:
+                    logger.error("Failed after %d retries due to rate limit: %s", max_retries, e)
+                    raise AnalysisFailed("Rate limit exceeded")
+            except Exception as e:
+                logger.error("An unexpected error occurred: %s", e)
+                raise AnalysisFailed(f"Unexpected error: {e}")
+        raise AnalysisFailed("Analysis failed after multiple retries")
+
+
+def analyze_property_with_gemini_with_retry(search_result, max_retries=3, initial_delay=5, limiter=None, known_uncached=False):
+    # Runs on worker threads, so problems are logged and returned rather than drawn with st.*
+    # known_uncached skips the cache lookup when the caller has just missed on this listing.
+    with tracing.span("analysis.listing", href=search_result.get('href')) as span:
+        analysis = _analyze_property(search_result, max_retries, initial_delay, limiter or gemini_limiter, known_uncached)
+        if "error" in analysis:
+            span.set(failed=analysis["error"])
+        return analysis
+
+
+def _analyze_property(search_result, max_retries, initial_delay, limiter, known_uncached):
+    cache_key = _cache_key(search_result)
+    if not known_uncached:
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        raw_response = _generate_unfenced(_analysis_prompt(search_result), limiter, max_retries, initial_delay)
+    except AnalysisFailed as e:
+        return {"error": str(e)}
+
+    if not raw_response.startswith('{'):
+        logger.warning("Gemini's response issue: %s...", raw_response[:50])
+        return {"error": "Response format issue"}
+
+    try:
+        analysis_dict = json.loads(raw_response)
+    except json.JSONDecodeError as e:
+        logger.warning("JSON Decode Error: %s: %s", e, raw_response)
+        return {"error": "Could not parse analysis"}
+    analysis_cache.set(cache_key, analysis_dict)
+    return analysis_dict
+
+
+def _is_valid_analysis(item):
+    return isinstance(item, dict) and any(field in item for field in ANALYSIS_FIELDS) \
+        and (item.get("amenities") is None or isinstance(item["amenities"], list))
+
+
+def _plan_batches(search_results):
+    """Splits listings into batches that fit the input and output token budgets."""
+    batches = []
+    batch = []
+    input_tokens = 0
+    for result in search_results:
+        tokens = (len(result['title']) + len(result['body'])) // CHARS_PER_TOKEN + 20
+        output_tokens = (len(batch) + 1) * OUTPUT_TOKENS_PER_LISTING
+        if batch and (len(batch) >= MAX_BATCH_SIZE or input_tokens + tokens > BATCH_INPUT_TOKEN_BUDGET
+                      or output_tokens > BATCH_OUTPUT_TOKEN_BUDGET):
+            batches.append(batch)
+            batch = []
+            input_tokens = 0
+        batch.append(result)
+        input_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def analyze_batch_with_gemini(search_results, max_retries=3, initial_delay=5, limiter=None):
+    """Analyzes several listings with one Gemini call.
+
+    Returns one entry per listing: its analysis dict, or None if the batch response had no
+    valid element for it (the caller decides how to retry those).
+    """
+    with tracing.span("analysis.batch", listings=len(search_results)) as span:
+        analyses = _analyze_batch(search_results, max_retries, initial_delay, limiter or gemini_limiter)
+        span.set(covered=sum(analysis is not None for analysis in analyses))
+        return analyses
+
+
+def _analyze_batch(search_results, max_retries, initial_delay, limiter):
+    analyses = [None] * len(search_results)
+    try:
+        raw_response = _generate_unfenced(_batch_analysis_prompt(search_results), limiter, max_retries, initial_delay)
+        items = json.loads(raw_response)
+    except (AnalysisFailed, json.JSONDecodeError) as e:
+        logger.warning("Batch analysis of %d listings failed: %s", len(search_results), e)
+        return analyses
+    if not isinstance(items, list):
+        logger.warning("Batch analysis returned %s instead of a list", type(items).__name__)
+        return analyses
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.pop("listing_index", None)
+        if not isinstance(index, int) or not 1 <= index <= len(search_results) or analyses[index - 1] is not None:
+            continue
+        if _is_valid_analysis(item):
+            analyses[index - 1] = item
+            analysis_cache.set(_cache_key(search_results[index - 1]), item)
+    return analyses
+
+
+def analyze_properties(search_results, max_workers=MAX_ANALYSIS_WORKERS, limiter=None, batched=True):
+    """Analyzes search results concurrently; the i-th analysis belongs to the i-th search result.
+
+    In batched mode uncached listings are packed several to a Gemini call, and only the
+    listings a batch failed to cover are re-sent one by one.
+    """
+    if not search_results:
+        return []
+    with tracing.span("analysis", listings=len(search_results), batched=batched) as span:
+        return _analyze_properties(search_results, max_workers, limiter, batched, span)
+
+
+def _analyze_properties(search_results, max_workers, limiter, batched, span):
+    analyze_one = tracing.propagate(lambda result: analyze_property_with_gemini_with_retry(result, limiter=limiter))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini") as pool:
+        if not batched:
+            return list(pool.map(analyze_one, search_results))
+
+        analyses = [analysis_cache.get(_cache_key(result)) for result in search_results]
+        uncached = [i for i, analysis in enumerate(analyses) if analysis is None]
+        batches = _plan_batches([search_results[i] for i in uncached])
+        span.set(cached=len(search_results) - len(uncached), batches=len(batches))
+        offset = 0
+        batch_jobs = []
+        for batch in batches:
+            indices = uncached[offset:offset + len(batch)]
+            offset += len(batch)
+            if len(batch) > 1: # A batch of one is sent through the single-listing prompt below
+                batch_jobs.append((indices, pool.submit(tracing.propagate(analyze_batch_with_gemini), batch, limiter=limiter)))
+        for indices, future in batch_jobs:
+            for i, analysis in zip(indices, future.result()):
+                analyses[i] = analysis
+
+        # Every listing left was a cache miss above, so it is not looked up again.
+        analyze_uncached = tracing.propagate(lambda result: analyze_property_with_gemini_with_retry(result, limiter=limiter, known_uncached=True))
+        missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+        for i, analysis in zip(missing, pool.map(analyze_uncached, [search_results[i] for i in missing])):
+            analyses[i] = analysis
+        return analyses
@@ -0,0 +1,78 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        # Blocks until `tokens` are available; the sleep happens outside the lock
+        # so other threads can keep refilling and consuming.
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by all callers of an API that can answer "too many requests".
+
+    A rate-limit error halves the rate and pauses every caller for the backoff delay;
+    each success creeps the rate back up towards `max_rate`.
+    """
+
+    def __init__(self, max_rate, capacity=None, min_rate=0.1, recovery_step=0.1):
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        self.recovery_step = float(recovery_step)
+        self._bucket = TokenBucket(max_rate, capacity)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self._bucket.rate
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self._bucket.acquire()
+
+    def set_max_rate(self, max_rate):
+        with self._lock:
+            self.max_rate = float(max_rate)
+            self._bucket.set_rate(self.max_rate)
+
+    def on_success(self):
+        with self._lock:
+            if self._bucket.rate < self.max_rate:
+                self._bucket.set_rate(min(self.max_rate, self._bucket.rate + self.recovery_step))
+
+    def on_rate_limited(self, delay):
+        with self._lock:
+            self._bucket.set_rate(max(self.min_rate, self._bucket.rate / 2))
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import api_calls
+import backends
+import tracing
+from cache import MemoryLRU, PersistentCache, SingleFlight, make_key
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SEARCH_REGION = 'in-mh'
+MAX_SEARCH_WORKERS = 4
+SEARCH_RATE_PER_SECOND = 2  # Replaces the fixed time.sleep(1) between queries
+SEARCH_BURST = 3
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+# How long a cached result stays fresh, per kind of query. Listings churn within hours;
+# facts about a locality or a builder barely change over days.
+SEARCH_CACHE_TTLS = {
+    "listings": 6 * HOUR,
+    "locality": 3 * DAY,
+    "builder": 7 * DAY,
+}
+SEARCH_MEMORY_CACHE_ENTRIES = 512
+SEARCH_CACHE_MAX_ENTRIES = 20000
+
+
+class SearchExecutor:
+    """Runs search-backend text queries (DuckDuckGo unless configured otherwise, see
+    backends) on a bounded thread pool behind a shared token bucket.
+    """
+
+    def __init__(self, max_workers=MAX_SEARCH_WORKERS, rate=SEARCH_RATE_PER_SECOND, burst=SEARCH_BURST, persistent_cache=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ddgs")
+        self._limiter = TokenBucket(rate, burst)
+        self._memory_cache = MemoryLRU(SEARCH_MEMORY_CACHE_ENTRIES)
+        self._persistent_cache = persistent_cache or PersistentCache(
+            "search", max(SEARCH_CACHE_TTLS.values()), SEARCH_CACHE_MAX_ENTRIES
+        )
+        self._in_flight = SingleFlight()
+
+    def set_rate(self, rate):
+        self._limiter.set_rate(rate)
+
+    def _fetch(self, query, max_results, region):
+        with tracing.span("duckduckgo.text") as span:
+            queued = time.perf_counter()
+            self._limiter.acquire()
+            span.set(rate_limit_wait_s=round(time.perf_counter() - queued, 4))
+            api_calls.record("duckduckgo")
+            return backends.search_backend().text(query, region, max_results)
+
+    def _search(self, query, max_results, region, family):
+        with tracing.span("search.query", query=query, family=family) as span:
+            results = self._lookup(query, max_results, region, family, span)
+            span.set(results=len(results))
+            return results
+
+    def _lookup(self, query, max_results, region, family, span):
+        # In-process LRU, then the shared SQLite store, then DuckDuckGo. Concurrent
+        # sessions asking for the same query share a single upstream fetch.
+        ttl = SEARCH_CACHE_TTLS[family]
+        key = make_key(query, region, max_results)
+        results = self._memory_cache.get(key, ttl)
+        if results is not None:
+            span.set(source="memory")
+            return results
+        entry = self._persistent_cache.get_entry(key, ttl)
+        if entry is not None:
+            span.set(source="sqlite")
+            self._memory_cache.set(key, *entry)
+            return entry[0]
+
+        def fetch_and_store():
+            span.set(source="web")
+            results = self._fetch(query, max_results, region)
+            self._persistent_cache.set(key, results)
+            self._memory_cache.set(key, results)
+            return results
+
+        span.set(source="shared") # Overwritten by fetch_and_store() if this call is the one fetching
+        return self._in_flight.do(key, fetch_and_store)
+
+    def search(self, query, max_results=1, region=SEARCH_REGION, family="listings"):
+        return self.search_many([query], max_results=max_results, region=region, family=family)[0]
+
+    def search_pages(self, query, page_size, region=SEARCH_REGION, family="listings"):
+        """Yields a query's results a page at a time, fetching each page only when the caller
+        asks for it. Stops after a short page.
+
+        Search backends take no offset, so page n asks for the first n * page_size results
+        and yields the ones past the previous page. Each request is cached like search()'s.
+        """
+        seen = 0
+        while True:
+            results = self.search(query, max_results=seen + page_size, region=region, family=family)
+            page = results[seen:]
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            seen = len(results)
+
+    def search_many(self, queries, max_results=1, region=SEARCH_REGION, family="listings"):
+        """Returns one result list per query, in the order given. Failed queries yield [].
+
+        `family` picks the cache TTL from SEARCH_CACHE_TTLS.
+        """
+        search = tracing.propagate(self._search)
+        futures = [self._pool.submit(search, query, max_results, region, family) for query in queries]
+        results = []
+        for query, future in zip(queries, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.warning("Search failed for %r: %s", query, e)
+                results.append([])
+        return results
+
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def get_search_executor():
+    # Shared across Streamlit reruns and sessions, since this module is only imported once.
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = SearchExecutor()
+        return _default_executor
@@ -0,0 +1,249 @@
+"""Semantic matching of amenities and localities with hashed n-gram embeddings.
+
+There is no embedding model: a phrase's vector is its character trigrams and words hashed
+into EMBEDDING_DIM buckets and L2-normalized, so cosine similarity shrugs off spelling
+variants, plurals and word order ("Fitness Center"/"fitness centre", "Andheri W"/"Andheri
+West"). Synonyms that share no letters ("Gym"/"health club", "Parking"/"car park") come
+from the concept vocabularies below. A phrase close enough to a vocabulary phrase takes on
+its concept, and two amenities that both have one match only if it is the same concept (so
+"Park" is a garden, not parking). Phrases outside the vocabulary fall back to plain
+similarity.
+
+Vectors and concept lookups are cached per phrase, and listings are matched in batches with
+one matrix product per batch.
+"""
+import re
+import threading
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from entity_summaries import LOCALITY_ALIASES, normalize_name
+
+EMBEDDING_DIM = 1024
+CONCEPT_THRESHOLD = 0.7  # A phrase at least this close to a vocabulary phrase takes on its concept
+CONCEPT_CACHE_ENTRIES = 16384
+AMENITY_THRESHOLD = 0.62  # For amenities outside the vocabulary
+LOCALITY_THRESHOLD = 0.8
+MAX_LOCALITY_WORDS = 3  # Longest place name looked for in listing text, in words
+DIRECTIONS = {"east": "east", "e": "east", "west": "west", "w": "west"}
+
+AMENITY_CONCEPTS = {
+    "gym": ("gym", "gymnasium", "fitness centre", "fitness center", "health club", "fitness studio", "workout area"),
+    "parking": ("parking", "car park", "car parking", "covered parking", "covered car park", "stilt parking",
+                "podium parking", "basement parking", "reserved parking", "open parking", "garage"),
+    "swimming pool": ("swimming pool", "pool", "infinity pool", "lap pool", "kids pool"),
+    "clubhouse": ("clubhouse", "club house", "community hall", "banquet hall", "party hall", "multipurpose hall"),
+    "garden": ("garden", "park", "landscaped garden", "podium garden", "terrace garden", "green area", "lawn"),
+    "security": ("security", "24x7 security", "cctv", "cctv surveillance", "gated community", "intercom", "video door phone"),
+    "lift": ("lift", "lifts", "elevator", "high speed elevators"),
+    "power backup": ("power backup", "power back up", "dg backup", "generator backup", "inverter backup"),
+    "play area": ("play area", "childrens play area", "kids play area", "playground", "tot lot"),
+    "jogging track": ("jogging track", "walking track", "running track", "cycling track"),
+    "sports": ("indoor games", "badminton court", "tennis court", "squash court", "basketball court", "sports facility"),
+    "water supply": ("24x7 water supply", "water supply", "rainwater harvesting", "water storage"),
+    "shopping": ("shopping centre", "shopping center", "convenience store", "retail shops"),
+    "spa": ("spa", "sauna", "steam room", "jacuzzi"),
+}
+
+# Localities beyond the summary aliases, with the spellings listings use for them.
+LOCALITY_CONCEPTS = {
+    "Andheri West": ("andheri west", "andheri w"),
+    "Andheri East": ("andheri east", "andheri e"),
+    "Bandra West": ("bandra west", "bandra w"),
+    "Borivali": ("borivali", "borivli", "borivali west", "borivali east"),
+    "Goregaon": ("goregaon", "goregaon west", "goregaon east"),
+    "Ghatkopar": ("ghatkopar", "ghatkopar east", "ghatkopar west"),
+    "Kandivali": ("kandivali", "kandivli", "kandivali west", "kandivali east"),
+    "Malad": ("malad", "malad west", "malad east"),
+    "Mulund": ("mulund", "mulund west", "mulund east"),
+    "Thane West": ("thane west", "thane w", "ghodbunder road", "majiwada"),
+    "Vikhroli": ("vikhroli", "kanjurmarg"),
+}
+
+
+def normalize(text):
+    return normalize_name(str(text)).replace("'", "")
+
+
+def _features(phrase):
+    text = f" {phrase} "
+    yield from (text[i:i + 3] for i in range(len(text) - 2))
+    yield from phrase.split()
+
+
+@lru_cache(maxsize=16384)
+def embed(phrase):
+    """The unit-length hashed n-gram vector of a normalized phrase (read-only)."""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature in _features(phrase):
+        vector[zlib.crc32(feature.encode("utf-8")) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    vector.flags.writeable = False
+    return vector
+
+
+def embed_many(phrases):
+    if not phrases:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.stack([embed(phrase) for phrase in phrases])
+
+
+class VectorIndex:
+    """Labelled phrase vectors; lookups score a batch of queries with one matrix product."""
+
+    def __init__(self, labelled_phrases, threshold=CONCEPT_THRESHOLD):
+        self.labels = [label for label, _ in labelled_phrases]
+        self.phrases = [normalize(phrase) for _, phrase in labelled_phrases]
+        self.matrix = embed_many(self.phrases)
+        self.threshold = threshold
+        self._concepts = {}
+        self._lock = threading.Lock()
+
+    def phrases_for(self, label):
+        return [phrase for phrase_label, phrase in zip(self.labels, self.phrases) if phrase_label == label]
+
+    def nearest(self, phrases):
+        """(label, similarity) of the closest indexed phrase for each normalized phrase."""
+        if not phrases or not self.labels:
+            return [(None, 0.0)] * len(phrases)
+        scores = embed_many(phrases) @ self.matrix.T
+        best = scores.argmax(axis=1)
+        return [(self.labels[j], float(scores[i, j])) for i, j in enumerate(best)]
+
+    def concepts(self, phrases):
+        """The label nearest each normalized phrase, or None if none is within the threshold.
+
+        Results are cached; the uncached phrases are looked up in one batch. Safe to call
+        from several threads.
+        """
+        with self._lock:
+            found = {phrase: self._concepts[phrase] for phrase in phrases if phrase in self._concepts}
+        missing = [phrase for phrase in dict.fromkeys(phrases) if phrase not in found]
+        if missing:
+            for phrase, (label, similarity) in zip(missing, self.nearest(missing)):
+                found[phrase] = label if similarity >= self.threshold else None
+            with self._lock:
+                if len(self._concepts) + len(missing) > CONCEPT_CACHE_ENTRIES:
+                    self._concepts = {}
+                self._concepts.update((phrase, found[phrase]) for phrase in missing)
+        return [found[phrase] for phrase in phrases]
+
+
+def _locality_phrases():
+    concepts = {name: list(phrases) for name, phrases in LOCALITY_CONCEPTS.items()}
+    for alias, name in LOCALITY_ALIASES.items():
+        concepts.setdefault(name, []).append(alias)
+    for name in concepts:
+        concepts[name].append(name)
+    return [(name, phrase) for name, phrases in concepts.items() for phrase in phrases]
+
+
+amenity_index = VectorIndex([(concept, phrase) for concept, phrases in AMENITY_CONCEPTS.items() for phrase in phrases])
+locality_index = VectorIndex(_locality_phrases())
+
+
+def amenity_matches(preferred, listed_per_listing):
+    """(listings x preferred) booleans: does listing i offer something like amenity j."""
+    matches = np.zeros((len(listed_per_listing), len(preferred)), dtype=bool)
+    listed = sorted({normalize(amenity) for amenities in listed_per_listing for amenity in amenities})
+    if not preferred or not listed:
+        return matches
+    preferred = [normalize(amenity) for amenity in preferred]
+    listed_concepts = np.array(amenity_index.concepts(listed), dtype=object)[:, None]
+    preferred_concepts = np.array(amenity_index.concepts(preferred), dtype=object)[None, :]
+    known = np.not_equal(listed_concepts, None) & np.not_equal(preferred_concepts, None)
+    similar = embed_many(listed) @ embed_many(preferred).T >= AMENITY_THRESHOLD
+    offered = np.where(known, listed_concepts == preferred_concepts, similar)
+
+    row = {amenity: i for i, amenity in enumerate(listed)}
+    for i, amenities in enumerate(listed_per_listing):
+        rows = [row[normalize(amenity)] for amenity in amenities]
+        if rows:
+            matches[i] = offered[rows].any(axis=0)
+    return matches
+
+
+def mentions_amenities(preferred, texts):
+    """(texts x preferred) booleans: does text i mention something like amenity j, for free
+    text such as a listing's title and body rather than an analyzed amenity list.
+    """
+    return amenity_matches(preferred, [sorted(_windows(text)) for text in texts])
+
+
+@lru_cache(maxsize=1024)
+def locality_phrases(location):
+    """The location and, if it is a known locality, every spelling of it."""
+    location = normalize(location)
+    concept, = locality_index.concepts([location])
+    if concept is None:
+        return (location,)
+    return tuple(dict.fromkeys([location] + locality_index.phrases_for(concept)))
+
+
+def _words(text):
+    return normalize(re.sub(r"[^\w\s]", " ", text)).split()
+
+
+def _windows(text):
+    words = _words(text)
+    return {" ".join(words[i:i + size]) for size in range(1, MAX_LOCALITY_WORDS + 1) for i in range(len(words) - size + 1)}
+
+
+def _direction(words):
+    """'east' or 'west' if the words name exactly one direction, else None."""
+    directions = {DIRECTIONS[word] for word in words if word in DIRECTIONS}
+    return directions.pop() if len(directions) == 1 else None
+
+
+def names_other_locality(location, texts):
+    """Booleans: does each text name a known locality other than `location`."""
+    concept, = locality_index.concepts([normalize(location)])
+    windows_per_text = [_windows(text) for text in texts]
+    windows = sorted(set().union(*windows_per_text))
+    if not windows:
+        return np.zeros(len(texts), dtype=bool)
+    others = {window for window, (label, similarity) in zip(windows, locality_index.nearest(windows))
+              if similarity >= LOCALITY_THRESHOLD and label != concept}
+    return np.array([bool(text_windows & others) for text_windows in windows_per_text], dtype=bool)
+
+
+def mentions_locality(location, texts):
+    """Booleans: does each text name `location`, under any of its spellings.
+
+    A spelling only matches a run of as many words as it has, so "andheri" alone is not
+    "andheri w". A mention whose direction ("Andheri East", or "Andheri" followed by "(E)")
+    contradicts the spelling's or the preferred location's direction does not count.
+    """
+    phrases = locality_phrases(location)
+    wanted = _direction(normalize(location).split())
+    phrase_sizes = [len(phrase.split()) for phrase in phrases]
+    phrase_directions = [_direction(phrase.split()) for phrase in phrases]
+    words_per_text = [_words(text) for text in texts]
+    windows = sorted({" ".join(words[i:i + size]) for words in words_per_text for size in set(phrase_sizes)
+                      for i in range(len(words) - size + 1)})
+    if not windows:
+        return np.zeros(len(texts), dtype=bool)
+    similar = embed_many(windows) @ embed_many(list(phrases)).T >= LOCALITY_THRESHOLD
+    sizes = np.array([len(window.split()) for window in windows])[:, None] == np.array(phrase_sizes)[None, :]
+    matched = {window: [phrase_directions[j] for j in np.flatnonzero(row)] for window, row in zip(windows, similar & sizes) if row.any()}
+
+    found = np.zeros(len(texts), dtype=bool)
+    for t, words in enumerate(words_per_text):
+        for size in set(phrase_sizes):
+            for i in range(len(words) - size + 1):
+                directions = matched.get(" ".join(words[i:i + size]))
+                if directions is None:
+                    continue
+                # The mention's own direction, or the one written right after it ("Chembur (E)").
+                direction = _direction(words[i:i + size]) or _direction(words[i + size:i + size + 1])
+                if direction is None or (wanted in (None, direction)
+                                         and any(expected in (None, direction) for expected in directions)):
+                    found[t] = True
+                    break
+            if found[t]:
+                break
+    return found
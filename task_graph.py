@@ -0,0 +1,86 @@
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+class DependencyFailed(Exception):
+    def __init__(self, task, dependency):
+        super().__init__(f"{task!r} skipped because {dependency!r} failed")
+        self.task = task
+        self.dependency = dependency
+
+
+class TaskGraph:
+    """Runs named tasks on a thread pool as soon as the tasks they depend on have finished.
+
+    A task is called with its dependencies' results as positional arguments, in the order
+    the dependencies were listed. Tasks may be added while as_completed() is being consumed,
+    which is how per-result work gets scheduled once an earlier stage's output is known.
+    Each task runs in a copy of the context it was added from, so context variables such as
+    the current trace carry over to the worker thread.
+    """
+
+    def __init__(self, max_workers=8):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._tasks = {}
+        self._futures = {}
+        self._pending = []
+
+    def add(self, name, fn, deps=()):
+        if name in self._tasks:
+            raise ValueError(f"Task {name!r} already exists")
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {name!r} depends on unknown task {dep!r}")
+        self._tasks[name] = (fn, tuple(deps), contextvars.copy_context())
+        self._pending.append(name)
+
+    def _schedule_ready(self):
+        still_pending = []
+        for name in self._pending:
+            fn, deps, context = self._tasks[name]
+            dep_futures = [self._futures.get(dep) for dep in deps]
+            if any(future is None or not future.done() for future in dep_futures):
+                still_pending.append(name)
+                continue
+            failed = next((dep for dep, future in zip(deps, dep_futures) if future.exception() is not None), None)
+            if failed is not None:
+                future = Future()
+                future.set_exception(DependencyFailed(name, failed))
+            else:
+                future = self._pool.submit(context.run, fn, *(future.result() for future in dep_futures))
+            self._futures[name] = future
+        self._pending = still_pending
+
+    def as_completed(self, on_wait=None, poll_interval=0.1):
+        """Yields (name, future) for every task as it finishes, including ones added meanwhile.
+
+        If given, `on_wait()` is called on the consuming thread at least every `poll_interval`
+        seconds while tasks run, and always before a finished task is yielded; this is where
+        progress that tasks report from their worker threads gets drawn.
+        """
+        reported = set()
+        while True:
+            self._schedule_ready()
+            # Collect finished tasks before on_wait(), so any progress they reported is drawn
+            # before they are yielded rather than on top of their final result.
+            done = [name for name, future in self._futures.items() if name not in reported and future.done()]
+            if on_wait is not None:
+                on_wait()
+            if not done:
+                running = [future for name, future in self._futures.items() if name not in reported]
+                if not running:
+                    break
+                wait(running, timeout=poll_interval if on_wait is not None else None, return_when=FIRST_COMPLETED)
+                continue
+            for name in done:
+                reported.add(name)
+                yield name, self._futures[name]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
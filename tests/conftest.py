@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root, and importing them opens the SQLite caches.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PROPERTY_FINDER_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="property-finder-tests-"), "cache.sqlite3"))
+os.environ.setdefault("PROPERTY_FINDER_BACKEND", "fake")
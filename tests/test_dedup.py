@@ -0,0 +1,26 @@
+from dedup import cluster, extend
+
+BODY = "2 BHK apartment in Chembur by Lodha Group; carpet area 900 sq ft; high floor; amenities: Gym, Parking; Near a mall"
+
+
+def _result(portal, price=None, suffix=""):
+    body = BODY + (f"; price {price}" if price else "") + suffix
+    return {'title': f"2 BHK Flat for Sale in Chembur - {portal}", 'body': body, 'href': f"https://{portal.lower()}.example/1"}
+
+
+def test_syndicated_copies_merge_despite_stray_numbers():
+    results = [_result("99acres", "₹1.30 Cr", ". Posted 3 days ago"), _result("MagicBricks", "₹1.30 Cr", ". Listed 12 days back"),
+               _result("Housing", "₹1.30 Cr")]
+    assert cluster(results) == [[0, 1, 2]]
+
+
+def test_copies_with_different_prices_are_not_merged_through_one_without_a_price():
+    results = [_result("99acres"), _result("MagicBricks", "₹1.2 Cr"), _result("NoBroker", "₹1.9 Cr")]
+    assert cluster(results) == [[0, 1], [2]]
+
+
+def test_extend_keeps_a_different_price_apart():
+    listings = [dict(_result("99acres"), duplicates=[_result("MagicBricks", "₹1.2 Cr")])]
+    new_listings = extend(listings, [_result("NoBroker", "₹1.9 Cr"), _result("Makaan", "₹1.2 Cr")])
+    assert [listing['href'] for listing in new_listings] == ["https://nobroker.example/1"]
+    assert [result['href'] for result in listings[0]['duplicates']] == ["https://magicbricks.example/1", "https://makaan.example/1"]
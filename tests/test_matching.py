@@ -0,0 +1,72 @@
+from matching import get_matcher
+
+PREFERENCES = {
+    'location': "Chembur",
+    'budget': "1 Cr - 1.5 Cr",
+    'carpet_area': "900",
+    'floor_preference': "",
+    'preferred_amenities': "gym, parking",
+    'financing': "",
+}
+
+
+def test_estimate_is_not_below_score_with_stray_numbers():
+    # "Sector 17" and "12 floors" are not a price or an area.
+    result = {'title': "2 BHK Flat in Sector 17, Chembur", 'body': "Tower of 12 floors, gym and parking", 'href': "https://example.com/1"}
+    analysis = {
+        'price': "1.2 Cr",
+        'area_sqft': {'carpet': "900 sq ft"},
+        'amenities': ["Gym", "Parking"],
+        'locality_highlights': "Chembur",
+    }
+    matcher = get_matcher(PREFERENCES)
+    score = matcher.compare([analysis], [result])[0]['score']
+    assert score == matcher.max_score
+    assert matcher.estimate([result])[0] >= score
+
+
+def test_estimate_counts_stated_price_outside_budget():
+    result = {'title': "2 BHK Flat in Chembur", 'body': "₹3.5 Cr, 900 sq ft, gym", 'href': "https://example.com/2"}
+    matcher = get_matcher(PREFERENCES)
+    assert matcher.estimate([result])[0] == matcher.max_score - 4
+
+
+MULTIPLE_FIGURES = {
+    'location': "Chembur",
+    'budget': "1 Cr - 1.5 Cr",
+    'carpet_area': "800",
+    'floor_preference': "",
+    'preferred_amenities': "gym",
+    'financing': "",
+}
+
+
+def _estimate_and_score(body):
+    result = {'title': "Flat in Chembur", 'body': body, 'href': "https://example.com/3"}
+    analysis = {
+        'price': "1.2 Cr",
+        'area_sqft': {'carpet': "800 sq ft"},
+        'amenities': ["Gym"],
+        'locality_highlights': "Chembur",
+    }
+    matcher = get_matcher(MULTIPLE_FIGURES)
+    return matcher.estimate([result])[0], matcher.compare([analysis], [result])[0]['score']
+
+
+def test_estimate_is_not_below_score_with_a_booking_amount():
+    estimate, score = _estimate_and_score("Booking amount ₹5 Lakh. Price ₹1.2 Cr, carpet 800 sq ft, gym")
+    assert score == 14
+    assert estimate >= score
+
+
+def test_estimate_is_not_below_score_with_several_unit_sizes():
+    estimate, score = _estimate_and_score("1 BHK 450 sq ft, 2 BHK 800 sq ft. ₹1.2 Cr onwards. Gym")
+    assert score == 14
+    assert estimate >= score
+
+
+def test_estimate_counts_location_only_when_another_locality_is_named():
+    matcher = get_matcher(PREFERENCES)
+    unnamed = {'title': "2 BHK Flat", 'body': "₹1.2 Cr, 900 sq ft, gym", 'href': "https://example.com/4"}
+    elsewhere = {'title': "2 BHK Flat in Powai", 'body': "₹1.2 Cr, 900 sq ft, gym", 'href': "https://example.com/5"}
+    assert list(matcher.estimate([unnamed, elsewhere])) == [matcher.max_score, matcher.max_score - 5]
@@ -0,0 +1,32 @@
+import semantic
+
+
+def test_amenity_synonyms_match():
+    matches = semantic.amenity_matches(["Gym", "Parking"], [["Fitness Centre", "Covered car park"], ["Park"]])
+    assert matches.tolist() == [[True, True], [False, False]]
+
+
+def test_locality_spellings_match():
+    texts = ["2 BHK in Chembur (E), near station", "Located in chembur east", "Chemburkar Marg, Wadala"]
+    assert semantic.mentions_locality("Chembur", texts).tolist() == [True, True, False]
+
+
+def test_locality_opposite_direction_does_not_match():
+    texts = ["Flat in Andheri East", "Andheri (E), near the metro", "Andheri", "Flat at Andheri West"]
+    assert semantic.mentions_locality("Andheri West", texts).tolist() == [False, False, False, True]
+    assert semantic.mentions_locality("Andheri East", texts).tolist() == [True, True, False, False]
+    assert semantic.mentions_locality("Thane West", ["Thane East flat", "Thane (W) station"]).tolist() == [False, True]
+
+
+def test_concepts_survive_cache_resets_from_other_threads(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(semantic, "CONCEPT_CACHE_ENTRIES", 4)
+    index = semantic.VectorIndex([("gym", "gym"), ("gym", "fitness centre"), ("parking", "car park")])
+
+    def lookup(n):
+        return index.concepts(["gym", "fitness centre", f"unrelated phrase {n}", "car park"])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for concepts in pool.map(lookup, range(400)):
+            assert concepts == ["gym", "gym", None, "parking"]
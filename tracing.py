@@ -0,0 +1,238 @@
+"""Timed spans grouped into per-run traces, plus process-wide metrics built from them.
+
+    with tracing.start_trace("recommendation") as trace:
+        with tracing.span("search.query", query=query) as span:
+            ...
+            span.set(source="web")
+    trace.to_jsonl()
+
+Spans nest through context variables, so a span opened inside another becomes its child.
+Work handed to a thread pool only joins the trace if the callable is wrapped with
+propagate(). Every finished span, inside a trace or not, also feeds the duration histograms
+that prometheus_text() renders, alongside the counters recorded with count().
+"""
+import contextvars
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+import api_calls
+
+METRIC_PREFIX = "property_finder"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+COUNTER_HELP = {
+    "cache_lookups_total": "Persistent cache lookups by cache and result.",
+    "gemini_tokens_total": "Gemini tokens by kind (prompt or response).",
+    "gemini_retries_total": "Gemini calls retried after a rate-limit error.",
+}
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """One timed operation. Attributes are free-form JSON-friendly values."""
+
+    def __init__(self, name, parent_id, trace_id, attributes):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.trace_id = trace_id
+        self.thread = threading.current_thread().name
+        self.attributes = attributes
+        self.error = None
+        self.start = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, attribute, amount=1):
+        """Adds to a numeric attribute, e.g. a retry count or a running token total."""
+        self.attributes[attribute] = self.attributes.get(attribute, 0) + amount
+
+    def _finish(self):
+        self.duration = time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "thread": self.thread,
+            "start": self.start,
+            "duration_s": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """The spans of one run (a Streamlit submission or one batch profile)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def _record(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self):
+        with self._lock:
+            return sorted(self._spans, key=lambda span: span.start)
+
+    def to_jsonl(self):
+        return "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in self.spans)
+
+    def waterfall(self):
+        """Rows of (depth, span, offset_s) in start order, offsets relative to the first span."""
+        spans = self.spans
+        if not spans:
+            return []
+        parents = {span.span_id: span.parent_id for span in spans}
+        origin = spans[0].start
+        rows = []
+        for span in spans:
+            depth = 0
+            parent = span.parent_id
+            while parent in parents:
+                depth += 1
+                parent = parents[parent]
+            rows.append((depth, span, span.start - origin))
+        return rows
+
+
+class Metrics:
+    """Span duration histograms and labelled counters, rendered in Prometheus text format."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._durations = {}  # span name -> [count per bucket..., total seconds, count]
+        self._errors = Counter()
+        self._counters = Counter()  # (name, sorted label items) -> value
+
+    def observe(self, span):
+        with self._lock:
+            histogram = self._durations.setdefault(span.name, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    histogram[i] += 1
+            histogram[-2] += span.duration
+            histogram[-1] += 1
+            if span.error is not None:
+                self._errors[span.name] += 1
+
+    def count(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] += amount
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            durations = {name: list(histogram) for name, histogram in self._durations.items()}
+            errors = dict(self._errors)
+            counters = dict(self._counters)
+
+        metric = f"{METRIC_PREFIX}_span_duration_seconds"
+        lines += [f"# HELP {metric} Time spent in each traced stage.", f"# TYPE {metric} histogram"]
+        for name, histogram in sorted(durations.items()):
+            for bound, bucket_count in zip(self.buckets, histogram):
+                lines.append(f"{metric}_bucket{_labels(span=name, le=bound)} {bucket_count}")
+            lines.append(f"{metric}_bucket{_labels(span=name, le='+Inf')} {histogram[-1]}")
+            lines.append(f"{metric}_sum{_labels(span=name)} {histogram[-2]:.6f}")
+            lines.append(f"{metric}_count{_labels(span=name)} {histogram[-1]}")
+
+        metric = f"{METRIC_PREFIX}_span_errors_total"
+        lines += [f"# HELP {metric} Traced stages that raised.", f"# TYPE {metric} counter"]
+        lines += [f"{metric}{_labels(span=name)} {count}" for name, count in sorted(errors.items())]
+
+        metric = f"{METRIC_PREFIX}_api_calls_total"
+        lines += [f"# HELP {metric} Requests sent to external APIs.", f"# TYPE {metric} counter"]
+        lines += [f"{metric}{_labels(api=api)} {count}" for api, count in sorted(api_calls.snapshot().items())]
+
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines += [f"# HELP {metric} {COUNTER_HELP.get(name, name)}", f"# TYPE {metric} counter"]
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{metric}{_labels(**dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Times the enclosed block as a child of the current span; yields the Span."""
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, trace.trace_id if trace else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current._finish()
+        if trace is not None:
+            trace._record(current)
+        metrics.observe(current)
+
+
+@contextmanager
+def start_trace(name, **attributes):
+    """Starts a new trace whose root span covers the enclosed block; yields the Trace."""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        with span(name, **attributes):
+            yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def propagate(fn):
+    """Wraps fn so that, on whichever thread it runs, its spans join the caller's trace."""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time, so each call gets a copy.
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def count(name, amount=1, **labels):
+    metrics.count(name, amount, **labels)
+
+
+def prometheus_text():
+    return metrics.prometheus_text()